@@ -0,0 +1,81 @@
+"""
+Сравнение способов запуска тестов Python в судье: "spawn" (новый интерпретатор
+на каждый тест) и "zygote" (форк заранее запущенного интерпретатора).
+
+Судья запускается прямо на хосте, без Docker (нужен Linux):
+    python benchmarks/python_executor.py [количество_тестов] [повторы]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_manager import JUDGE_SCRIPT_PYTHON, ZYGOTE_SCRIPT_PYTHON
+from test_store import TestStore
+
+SOLUTION = "a, b = map(int, input().split())\nprint(a + b)\n"
+
+
+def run_judge(run_dir, store, test_set, judge_path, zygote_path=None, workers=1):
+    env = dict(os.environ)
+    env.update({
+        "JUDGE_TESTS_ROOT": store.root_dir,
+        "JUDGE_TEST_SET": test_set.key,
+        "JUDGE_WORKERS": str(workers),
+    })
+    if zygote_path:
+        env["JUDGE_ZYGOTE"] = zygote_path
+
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, judge_path], cwd=run_dir, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    elapsed = time.perf_counter() - start
+
+    verdicts = [json.loads(line) for line in result.stdout.decode('utf-8').splitlines() if line.strip()]
+    verdicts = [v for v in verdicts if "verdict" in v]
+    return elapsed, verdicts
+
+
+def main():
+    test_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    work_dir = tempfile.mkdtemp(prefix="synaq-bench-")
+    try:
+        store = TestStore(os.path.join(work_dir, "store"))
+        tests = [{'input': f"{i} {i + 1}", 'output': str(2 * i + 1), 'limit': 1.0} for i in range(test_count)]
+        test_set = store.get_for_list(tests)
+        judge_path = os.path.join(store.root_dir, store.put_script(JUDGE_SCRIPT_PYTHON))
+        zygote_path = os.path.join(store.root_dir, store.put_script(ZYGOTE_SCRIPT_PYTHON))
+
+        run_dir = os.path.join(work_dir, "run")
+        os.makedirs(run_dir)
+        with open(os.path.join(run_dir, "script.py"), "w", encoding="utf-8") as f:
+            f.write(SOLUTION)
+
+        print(f"Тестов: {test_count}, повторов: {repeats}")
+        results = {}
+        for mode, path in (("spawn", None), ("zygote", zygote_path)):
+            times = []
+            for _ in range(repeats):
+                elapsed, verdicts = run_judge(run_dir, store, test_set, judge_path, path)
+                times.append(elapsed)
+            results[mode] = [(v["verdict"], v["output"]) for v in verdicts]
+            cpu = sum(v.get("cpu_time", 0) for v in verdicts) / max(1, len(verdicts))
+            best = min(times)
+            print(f"{mode:>7}: лучшее {best:.3f} с ({best / test_count * 1000:.1f} мс на тест), "
+                  f"среднее CPU теста {cpu * 1000:.1f} мс")
+
+        same = results["spawn"] == results["zygote"]
+        print("Вердикты и вывод совпадают" if same else "ВНИМАНИЕ: результаты различаются!")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
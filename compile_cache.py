@@ -0,0 +1,124 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+BINARY_SUFFIX = ".bin"
+ERROR_SUFFIX = ".err"
+
+
+class CompileCache:
+    """
+    Кэш результатов компиляции на хосте.
+    Ключ - хэш исходника, флагов компилятора и ID образа Docker, значение -
+    готовый бинарник (.bin) или текст ошибки компиляции (.err).
+    Старые записи вытесняются по принципу LRU, когда размер превышает max_bytes.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # имя файла -> размер, от давно использованных к свежим
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def make_key(source, flags, image_id):
+        h = hashlib.sha256()
+        h.update(source.encode('utf-8'))
+        h.update(b"\0")
+        h.update(" ".join(flags).encode('utf-8'))
+        h.update(b"\0")
+        h.update(image_id.encode('utf-8'))
+        return h.hexdigest()
+
+    def get(self, key):
+        """
+        Возвращает ('binary', bytes), ('error', str) или None, если в кэше ничего нет.
+        """
+        with self.lock:
+            for suffix in (BINARY_SUFFIX, ERROR_SUFFIX):
+                filename = key + suffix
+                if filename not in self.entries:
+                    continue
+                path = os.path.join(self.cache_dir, filename)
+                try:
+                    with open(path, "rb") as f:
+                        data = f.read()
+                    # Обновляем mtime, чтобы порядок LRU сохранился после перезапуска
+                    os.utime(path)
+                except OSError:
+                    self._forget(filename)
+                    continue
+
+                self.entries.move_to_end(filename)
+                self.hits += 1
+                if suffix == BINARY_SUFFIX:
+                    return ('binary', data)
+                return ('error', data.decode('utf-8', errors='replace'))
+
+            self.misses += 1
+            return None
+
+    def put_binary(self, key, data):
+        self._put(key + BINARY_SUFFIX, data)
+
+    def put_error(self, key, error_msg):
+        self._put(key + ERROR_SUFFIX, error_msg.encode('utf-8'))
+
+    def _put(self, filename, data):
+        if len(data) > self.max_bytes:
+            return
+        path = os.path.join(self.cache_dir, filename)
+        tmp_path = path + ".tmp"
+        with self.lock:
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"WARNING: Не удалось сохранить {filename} в кэш компиляции: {e}")
+                return
+
+            self._forget(filename, remove_file=False)
+            self.entries[filename] = len(data)
+            self.total_bytes += len(data)
+            self._evict()
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self.entries:
+            oldest = next(iter(self.entries))
+            self._forget(oldest)
+
+    def _forget(self, filename, remove_file=True):
+        size = self.entries.pop(filename, None)
+        if size is not None:
+            self.total_bytes -= size
+        if remove_file:
+            try:
+                os.remove(os.path.join(self.cache_dir, filename))
+            except OSError:
+                pass
+
+    def _load_index(self):
+        """Восстанавливает индекс по файлам на диске (порядок LRU - по времени последнего изменения)."""
+        files = []
+        for filename in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, filename)
+            if filename.endswith(".tmp"):
+                os.remove(path)
+                continue
+            if not (filename.endswith(BINARY_SUFFIX) or filename.endswith(ERROR_SUFFIX)):
+                continue
+            stat = os.stat(path)
+            files.append((stat.st_mtime, filename, stat.st_size))
+
+        for _, filename, size in sorted(files):
+            self.entries[filename] = size
+            self.total_bytes += size
+        self._evict()
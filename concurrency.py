@@ -0,0 +1,152 @@
+import os
+import threading
+import time
+from collections import deque
+
+# Как часто контроллер пересматривает число одновременных проверок (секунды)
+ADJUST_INTERVAL = 5.0
+# Меньше стольких тестов за интервал - задержку и долю TLE не учитываем (мало данных)
+MIN_SAMPLE_TESTS = 20
+
+# Пороги перегрузки
+LOAD_HIGH = 1.0  # Средняя загрузка (loadavg за минуту) на одно ядро
+LOAD_LOW = 0.8  # Ниже - можно добавлять слоты
+MEMORY_AVAILABLE_LOW = 0.10  # Доля свободной памяти хоста
+STRETCH_HIGH = 1.5  # Во сколько раз wall time тестов больше их CPU time (процессы ждут ядро)
+TLE_RATE_HIGH = 0.25  # Доля тестов с TLE
+
+# AIMD: при перегрузке лимит умножается на DECREASE_FACTOR, иначе растет на 1
+DECREASE_FACTOR = 0.75
+
+DECISION_HISTORY_SIZE = 50
+
+
+def host_cpu_load():
+    """loadavg за минуту на одно ядро или None (например, в Windows)."""
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return None
+
+
+def host_memory_available():
+    """Доля доступной памяти хоста (по /proc/meminfo) или None."""
+    try:
+        values = {}
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                values[key] = int(rest.split()[0])
+        return values["MemAvailable"] / values["MemTotal"]
+    except (OSError, KeyError, ValueError, IndexError, ZeroDivisionError):
+        return None
+
+
+class AdaptiveConcurrency:
+    """
+    Подбирает число одновременных проверок (AIMD) в пределах [min_limit, max_limit].
+    Перегрузка - высокая загрузка CPU или мало памяти на хосте, тесты идут заметно
+    дольше своего CPU time или много TLE: тогда лимит уменьшается в DECREASE_FACTOR раз.
+    Если перегрузки нет, а посылки ждут слот - лимит растет на 1.
+    apply(limit) вызывается при каждом изменении; has_backlog() - есть ли ожидающие посылки.
+    """
+
+    def __init__(self, min_limit, max_limit, apply, has_backlog=None):
+        self.min_limit = max(1, min(min_limit, max_limit))
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = self.max_limit
+        self.apply = apply
+        self.has_backlog = has_backlog or (lambda: True)
+
+        self.lock = threading.Lock()
+        self._reset_window()
+        self.last_signals = {}
+        self.decisions = deque(maxlen=DECISION_HISTORY_SIZE)
+
+    def start(self):
+        threading.Thread(target=self._loop, name="judge-concurrency", daemon=True).start()
+
+    def record(self, verdicts, global_err):
+        """Учитывает результат проверки одной посылки (как его вернули run_python/run_cpp)."""
+        with self.lock:
+            if global_err and "Time Limit" in global_err:
+                self.tests += 1
+                self.tle += 1
+                return
+            for verdict in verdicts or []:
+                self.tests += 1
+                if verdict.get('verdict') == "Time Limit Exceeded":
+                    self.tle += 1
+                self.cpu_time += verdict.get('cpu_time') or 0.0
+                self.wall_time += verdict.get('wall_time') or 0.0
+
+    def stats(self):
+        with self.lock:
+            return {
+                'limit': self.limit,
+                'min_limit': self.min_limit,
+                'max_limit': self.max_limit,
+                'signals': dict(self.last_signals),
+                'decisions': list(self.decisions)
+            }
+
+    def _reset_window(self):
+        self.tests = 0
+        self.tle = 0
+        self.cpu_time = 0.0
+        self.wall_time = 0.0
+
+    def _loop(self):
+        while True:
+            time.sleep(ADJUST_INTERVAL)
+            try:
+                self._adjust()
+            except Exception as e:
+                print(f"ERROR: Ошибка регулятора числа проверок: {e}")
+
+    def _signals(self):
+        with self.lock:
+            tests, tle, cpu_time, wall_time = self.tests, self.tle, self.cpu_time, self.wall_time
+            self._reset_window()
+
+        enough = tests >= MIN_SAMPLE_TESTS
+        return {
+            'cpu_load': host_cpu_load(),
+            'memory_available': host_memory_available(),
+            'stretch': wall_time / cpu_time if enough and cpu_time > 0 else None,
+            'tle_rate': tle / tests if enough else None,
+            'tests': tests
+        }
+
+    def _adjust(self):
+        signals = self._signals()
+        reasons = []
+        if signals['cpu_load'] is not None and signals['cpu_load'] > LOAD_HIGH:
+            reasons.append(f"загрузка CPU {signals['cpu_load']:.2f}")
+        if signals['memory_available'] is not None and signals['memory_available'] < MEMORY_AVAILABLE_LOW:
+            reasons.append(f"свободно памяти {signals['memory_available']:.0%}")
+        if signals['stretch'] is not None and signals['stretch'] > STRETCH_HIGH:
+            reasons.append(f"wall/CPU тестов {signals['stretch']:.2f}")
+        if signals['tle_rate'] is not None and signals['tle_rate'] > TLE_RATE_HIGH:
+            reasons.append(f"доля TLE {signals['tle_rate']:.0%}")
+
+        with self.lock:
+            old_limit = self.limit
+            if reasons:
+                new_limit = max(self.min_limit, int(old_limit * DECREASE_FACTOR))
+                reason = "перегрузка: " + ", ".join(reasons)
+            elif (signals['cpu_load'] is None or signals['cpu_load'] < LOAD_LOW) and self.has_backlog():
+                new_limit = min(self.max_limit, old_limit + 1)
+                reason = "есть очередь, хост не перегружен"
+            else:
+                new_limit = old_limit
+                reason = None
+            self.last_signals = signals
+            if new_limit == old_limit:
+                return
+            self.limit = new_limit
+            self.decisions.append({'time': time.time(), 'from': old_limit, 'to': new_limit,
+                                   'reason': reason, 'signals': signals})
+
+        print(f"INFO: Лимит одновременных проверок {old_limit} -> {new_limit} ({reason})")
+        self.apply(new_limit)
@@ -0,0 +1,178 @@
+import os
+import subprocess
+import tempfile
+import shutil
+import threading
+import time
+import uuid
+
+import docker_backend
+
+# Сколько секунд не пытаемся поднимать новые контейнеры после неудачного старта
+# (например, Docker не запущен или образ не собран)
+START_RETRY_DELAY = 30.0
+
+# Команда "обнуления" контейнера между посылками:
+# убиваем все оставшиеся процессы appuser (кроме PID 1 - sleep) и чистим /tmp
+RESET_COMMAND = ["sh", "-c", "kill -9 -1 2>/dev/null; rm -rf /tmp/* /tmp/.[!.]* 2>/dev/null; true"]
+
+
+class PooledContainer:
+    """Один заранее запущенный контейнер и его рабочая папка на хосте."""
+
+    def __init__(self, name, image, host_dir):
+        self.name = name
+        self.image = image
+        self.host_dir = host_dir
+        self.uses = 0
+        self.broken = False
+
+    def exec_command(self, container_command, env=None):
+        """Команда docker exec для запуска процесса внутри этого контейнера."""
+        env_args = [arg for k, v in (env or {}).items() for arg in ("-e", f"{k}={v}")]
+        return ["docker", "exec"] + env_args + [self.name] + container_command
+
+    def clear_host_dir(self):
+        for entry in os.listdir(self.host_dir):
+            path = os.path.join(self.host_dir, entry)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+
+
+class ContainerPool:
+    """
+    Пул "теплых" контейнеров для одного образа.
+    Контейнеры запускаются с теми же ограничениями, что и одноразовые (run_args),
+    но живут долго: посылка выполняется через docker exec, после чего контейнер
+    очищается и возвращается в пул. После max_uses посылок контейнер пересоздается.
+    """
+
+    def __init__(self, image, size, max_uses, run_args, get_docker_path, mount_point, extra_volumes=None,
+                 scratch_root=None):
+        self.image = image
+        self.size = size
+        self.max_uses = max_uses
+        self.run_args = run_args
+        self.get_docker_path = get_docker_path
+        self.mount_point = mount_point
+        # Дополнительные тома, общие для всех контейнеров (например, хранилище тестов)
+        self.extra_volumes = extra_volumes or []
+        # Где создавать рабочие папки контейнеров (None - обычная временная папка)
+        self.scratch_root = scratch_root
+
+        self.lock = threading.Lock()
+        self.idle = []
+        self.total = 0  # Сколько контейнеров существует (свободные + занятые + в процессе запуска)
+        self.last_start_failure = 0.0
+
+    def warm_up(self, count=None):
+        """Заранее поднимает контейнеры (вызывается в фоне при старте сервера)."""
+        count = self.size if count is None else min(count, self.size)
+        for _ in range(count):
+            with self.lock:
+                if self.total >= self.size:
+                    return
+                self.total += 1
+            container = self._start_container()
+            with self.lock:
+                if container is None:
+                    self.total -= 1
+                    return
+                self.idle.append(container)
+        print(f"INFO: Пул контейнеров {self.image} прогрет ({count} шт.)")
+
+    def acquire(self):
+        """
+        Возвращает свободный контейнер или None, если пул исчерпан
+        (тогда вызывающий код запускает одноразовый контейнер как раньше).
+        """
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+            if self.total >= self.size:
+                return None
+            if time.time() - self.last_start_failure < START_RETRY_DELAY:
+                return None
+            self.total += 1
+
+        container = self._start_container()
+        if container is None:
+            with self.lock:
+                self.total -= 1
+        return container
+
+    def release(self, container):
+        """Возвращает контейнер после посылки. Очистка идет в фоне, чтобы не задерживать ответ."""
+        container.uses += 1
+        threading.Thread(target=self._recycle, args=(container,), daemon=True).start()
+
+    def shutdown(self):
+        with self.lock:
+            containers = self.idle
+            self.idle = []
+        for container in containers:
+            self._remove_container(container)
+
+    def _recycle(self, container):
+        if not container.broken and container.uses < self.max_uses:
+            try:
+                container.clear_host_dir()
+                reset = docker_backend.run(
+                    container.exec_command(RESET_COMMAND),
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    timeout=10
+                )
+                if reset.returncode == 0:
+                    with self.lock:
+                        self.idle.append(container)
+                    return
+            except Exception as e:
+                print(f"WARNING: Не удалось очистить контейнер {container.name}: {e}")
+
+        self._remove_container(container)
+        with self.lock:
+            self.total -= 1
+
+    def _start_container(self):
+        name = f"synaq-pool-{uuid.uuid4().hex[:12]}"
+        host_dir = tempfile.mkdtemp(prefix="synaq-pool-", dir=self.scratch_root)
+        docker_path = self.get_docker_path(os.path.abspath(host_dir))
+
+        volume_args = [arg for volume in self.extra_volumes for arg in ("-v", volume)]
+        command = self.run_args + [
+            "-d",
+            "--name", name,
+            "-v", f"{docker_path}:{self.mount_point}:ro",
+        ] + volume_args + [
+            self.image,
+            "sleep", "infinity"
+        ]
+        try:
+            result = docker_backend.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=60)
+            if result.returncode == 0:
+                return PooledContainer(name, self.image, host_dir)
+            err = result.stderr.decode('utf-8', errors='replace').strip()
+            print(f"WARNING: Не удалось запустить контейнер пула {self.image}: {err}")
+        except Exception as e:
+            print(f"WARNING: Не удалось запустить контейнер пула {self.image}: {e}")
+
+        with self.lock:
+            self.last_start_failure = time.time()
+        shutil.rmtree(host_dir, ignore_errors=True)
+        return None
+
+    def _remove_container(self, container):
+        try:
+            # Контейнер запущен с --rm, поэтому docker rm -f удаляет его полностью
+            docker_backend.run(
+                ["docker", "rm", "-f", container.name],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=30
+            )
+        except Exception as e:
+            print(f"WARNING: Не удалось удалить контейнер {container.name}: {e}")
+        shutil.rmtree(container.host_dir, ignore_errors=True)
@@ -1,626 +1,1320 @@
-import sys
-import os
-import sqlite3
-import subprocess
-import tempfile
-import json
-import platform
-import shutil 
-import time
-# НАСТРОЙКИ БЕЗОПАСНОСТИ DOCKER
-DOCKER_IMAGE_PYTHON = "testirovschik-python"
-DOCKER_IMAGE_CPP = "testirovschik-cpp"
-
-DOCKER_COMMON_ARGS = [
-    "docker", "run",
-    "--rm",             
-    # "-i" больше не нужен
-    "--network=none",   
-    "--memory=256m",    
-    "--cpus=1.0",       
-    "--pids-limit=10",  
-    "--user=appuser",   
-    "-w", "/home/appuser/run" 
-]
-
-# --- Скрипт "внутреннего судьи" для Python (без изменений) ---
-JUDGE_SCRIPT_PYTHON = """
-import sys
-import os
-import json
-import subprocess
-import time
-
-def run_judge():
-    results = []
-    
-    try:
-        with open('tests.json', 'r') as f:
-            tests = json.load(f)
-    except Exception as e:
-        print(json.dumps([{"verdict": "Internal Error", "error": f"Failed to read tests.json: {e}"}]))
-        return
-
-    for i, test in enumerate(tests):
-        test_input = test.get('input', '')
-        expected_output = test.get('output', '')
-        time_limit = float(test.get('limit', 1.0))
-        safe_time_limit = max(1.0, time_limit) 
-        
-        try:
-            start_time = time.monotonic()
-            
-            process = subprocess.run(
-                ['timeout', str(safe_time_limit), 'python3', 'script.py'],
-                input=test_input.encode('utf-8'),
-                capture_output=True,
-                timeout=safe_time_limit + 2.0 
-            )
-            
-            duration = time.monotonic() - start_time
-            output = process.stdout.decode('utf-8', errors='replace')
-            error = process.stderr.decode('utf-8', errors='replace')
-            return_code = process.returncode
-            
-            verdict = ""
-            
-            if return_code == 124:
-                verdict = "Time Limit Exceeded"
-            elif return_code != 0:
-                verdict = "Runtime Error"
-            else:
-                norm_out = output.replace('\\r\\n', '\\n').strip()
-                norm_exp = expected_output.replace('\\r\\n', '\\n').strip()
-                
-                if norm_out.split('\\n') == norm_exp.split('\\n'):
-                    verdict = "Accepted"
-                else:
-                    verdict = "Wrong Answer"
-            
-            results.append({
-                "test_num": i + 1,
-                "verdict": verdict,
-                "output": output,
-                "error": error
-            })
-
-        except subprocess.TimeoutExpired:
-            results.append({
-                "test_num": i + 1,
-                "verdict": "Time Limit Exceeded",
-                "output": "",
-                "error": "Judge subprocess timeout"
-            })
-        except Exception as e:
-            results.append({
-                "test_num": i + 1,
-                "verdict": "Internal Error",
-                "output": "",
-                "error": str(e)
-            })
-
-    print(json.dumps(results))
-
-if __name__ == "__main__":
-    run_judge()
-"""
-
-# --- Скрипт "внутреннего судьи" для C++ (ИСПРАВЛЕН) ---
-JUDGE_SCRIPT_CPP = """
-import sys
-import os
-import json
-import subprocess
-import time
-
-def run_judge():
-    results = []
-    
-    # 1. Компиляция (ОДИН РАЗ)
-    try:
-        # --- ИСПРАВЛЕНИЕ 1: Компилируем в /tmp/a.out ---
-        compile_proc = subprocess.run(
-            ['g++', 'source.cpp', '-o', '/tmp/a.out', '-O2', '-std=c++17'],
-            capture_output=True, text=True, timeout=10
-        )
-    except subprocess.TimeoutExpired:
-        print(json.dumps([{"verdict": "Compilation Error", "error": "Compilation timed out (> 10s)"}]))
-        return
-
-    if compile_proc.returncode != 0:
-        error_msg = compile_proc.stderr.replace("source.cpp:", "line ")
-        print(json.dumps([{"verdict": "Compilation Error", "error": error_msg}]))
-        return
-
-    # 2. Загружаем список тестов
-    try:
-        with open('tests.json', 'r') as f:
-            tests = json.load(f)
-    except Exception as e:
-        print(json.dumps([{"verdict": "Internal Error", "error": f"Failed to read tests.json: {e}"}]))
-        return
-
-    # 3. Прогоняем каждый тест
-    for i, test in enumerate(tests):
-        test_input = test.get('input', '')
-        expected_output = test.get('output', '')
-        time_limit = float(test.get('limit', 1.0))
-        safe_time_limit = max(1.0, time_limit)
-        
-        try:
-            start_time = time.monotonic()
-            
-            # --- ИСПРАВЛЕНИЕ 2: Запускаем /tmp/a.out ---
-            process = subprocess.run(
-                ['timeout', str(safe_time_limit), '/tmp/a.out'],
-                input=test_input.encode('utf-8'),
-                capture_output=True,
-                timeout=safe_time_limit + 2.0
-            )
-            
-            duration = time.monotonic() - start_time
-            output = process.stdout.decode('utf-8', errors='replace')
-            error = process.stderr.decode('utf-8', errors='replace')
-            return_code = process.returncode
-            
-            verdict = ""
-            
-            if return_code == 124:
-                verdict = "Time Limit Exceeded"
-            elif return_code != 0:
-                verdict = "Runtime Error"
-            else:
-                norm_out = output.replace('\\r\\n', '\\n').strip()
-                norm_exp = expected_output.replace('\\r\\n', '\\n').strip()
-                
-                if norm_out.split('\\n') == norm_exp.split('\\n'):
-                    verdict = "Accepted"
-                else:
-                    verdict = "Wrong Answer"
-            
-            results.append({
-                "test_num": i + 1,
-                "verdict": verdict,
-                "output": output,
-                "error": error
-            })
-
-        except subprocess.TimeoutExpired:
-            results.append({
-                "test_num": i + 1,
-                "verdict": "Time Limit Exceeded",
-                "output": "",
-                "error": "Judge subprocess timeout"
-            })
-        except Exception as e:
-            results.append({
-                "test_num": i + 1,
-                "verdict": "Internal Error",
-                "output": "",
-                "error": str(e)
-            })
-
-    # 4. Возвращаем JSON-массив со всеми результатами
-    print(json.dumps(results))
-
-if __name__ == "__main__":
-    run_judge()
-"""
-
-def _get_docker_path(abs_path):
-    r"""Конвертирует путь Windows (C:\...) в /c/... для Docker."""
-    if platform.system() == "Windows":
-         abs_path = abs_path.replace("\\", "/")
-         if abs_path[1] == ":":
-            abs_path = "/" + abs_path[0].lower() + abs_path[2:]
-    return abs_path
-
-class DBManager:
-   
-    def __init__(self, db_name="testirovschik.db"):
-        self.db_name = db_name
-        self.conn = sqlite3.connect(self.db_name, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
-        self.create_tables()
-        self._create_olympiad_tables()
-
-    def _create_olympiad_tables(self):
-        c = self.conn.cursor()
-        c.execute('''CREATE TABLE IF NOT EXISTS olympiad_results (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        olympiad_id TEXT NOT NULL,
-                        participant_uuid TEXT NOT NULL,
-                        nickname TEXT NOT NULL,
-                        total_score INTEGER,
-                        task_scores TEXT, 
-                        UNIQUE(olympiad_id, participant_uuid)
-                    )''')
-
-        c.execute("PRAGMA table_info(olympiad_results)")
-        columns = [col[1] for col in c.fetchall()]
-        if "organization" not in columns:
-            print("INFO: Updating database. Adding 'organization' column to 'olympiad_results' table.")
-            c.execute("ALTER TABLE olympiad_results ADD COLUMN organization TEXT")
-            
-        c.execute("PRAGMA table_info(olympiad_results)")
-        columns = [col[1] for col in c.fetchall()]
-        if "disqualified" not in columns:
-            print("INFO: Updating database. Adding 'disqualified' column to 'olympiad_results' table.")
-            c.execute("ALTER TABLE olympiad_results ADD COLUMN disqualified BOOLEAN DEFAULT 0")
-
-        c.execute('''CREATE TABLE IF NOT EXISTS olympiad_submissions (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        olympiad_id TEXT NOT NULL,
-                        participant_uuid TEXT NOT NULL,
-                        nickname TEXT NOT NULL,
-                        task_submissions TEXT, 
-                        UNIQUE(olympiad_id, participant_uuid)
-                    )''')
-        
-        c.execute('''CREATE TABLE IF NOT EXISTS olympiad_whitelist (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        olympiad_id TEXT NOT NULL,
-                        nickname TEXT NOT NULL,
-                        organization TEXT,
-                        password TEXT NOT NULL,
-                        UNIQUE(olympiad_id, nickname) 
-                    )''')
-        self.conn.commit()
-
-    def save_olympiad_data(self, olympiad_id, olympiad_data):
-        c = self.conn.cursor()
-        participants = olympiad_data.get('participants', {})
-        for p_uuid, p_data in participants.items():
-            nickname = p_data.get('nickname')
-            organization = p_data.get('organization', None) 
-            disqualified = p_data.get('disqualified', False)
-            scores = p_data.get('scores', {})
-            
-            total_score = 0
-            
-            total_score = sum(s.get('score', 0) for s in scores.values())
-
-            task_scores_json = json.dumps(scores) 
-            # -------------------------------
-            
-            c.execute("""
-                INSERT INTO olympiad_results (olympiad_id, participant_uuid, nickname, organization, total_score, task_scores, disqualified)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(olympiad_id, participant_uuid) DO UPDATE SET
-                organization=excluded.organization, total_score=excluded.total_score, task_scores=excluded.task_scores,
-                disqualified=excluded.disqualified
-            """, (olympiad_id, p_uuid, nickname, organization, total_score, task_scores_json, disqualified))
-            submissions = p_data.get('last_submissions', {})
-            submissions_json = json.dumps(submissions)
-            c.execute("""
-                INSERT INTO olympiad_submissions (olympiad_id, participant_uuid, nickname, task_submissions)
-                VALUES (?, ?, ?, ?)
-                ON CONFLICT(olympiad_id, participant_uuid) DO UPDATE SET
-                task_submissions=excluded.task_submissions
-            """, (olympiad_id, p_uuid, nickname, submissions_json))
-        self.conn.commit()
-        
-    def get_olympiad_results(self, olympiad_id):
-        c = self.conn.cursor()
-        c.execute("""
-            SELECT participant_uuid, nickname, organization, total_score, task_scores, disqualified
-            FROM olympiad_results WHERE olympiad_id = ?
-        """, (olympiad_id,)) # Убрали ORDER BY здесь, отсортируем в Python
-        
-        participants_raw = c.fetchall()
-        if not participants_raw:
-            return None 
-
-        participants_list = []
-        task_ids = set()
-        
-        for p in participants_raw:
-            # BUGFIX #3: Читаем полный JSON
-            scores_full = json.loads(p['task_scores']) 
-            
-            # Собираем ID задач для заголовка таблицы
-            task_ids.update(scores_full.keys())
-            
-            # Пересчитываем итоговые штрафы/баллы, так как в базе в total_score лежит только сумма очков
-            total_score_calc = 0
-            total_penalty_calc = 0
-            
-            # Проходимся по задачам и считаем итоги
-            for tid, info in scores_full.items():
-                # Если старый формат базы (просто число), обрабатываем (на всякий случай)
-                if isinstance(info, int):
-                    info = {'score': info, 'attempts': 0, 'passed': False, 'penalty': 0}
-                    scores_full[tid] = info # Обновляем до словаря
-                
-                total_score_calc += info.get('score', 0)
-                if info.get('passed'):
-                    total_penalty_calc += info.get('penalty', 0)
-
-            participants_list.append({
-                'nickname': p['nickname'],
-                'organization': p['organization'],
-                'scores': scores_full, # Теперь тут есть и штрафы, и попытки
-                'total_score': total_score_calc,
-                'total_penalty': total_penalty_calc,
-                'disqualified': p['disqualified'] 
-            })
-            
-        # Получаем детали задач
-        task_ids_list = sorted(list(task_ids), key=int)
-        tasks_details = [self.get_task_details(tid) for tid in task_ids_list]
-        
-        # Сортировка (ICPC или по очкам) - делаем "умную" сортировку
-        # Сначала по очкам (убывание), потом по штрафам (возрастание)
-        participants_list.sort(key=lambda p: (-p['total_score'], p['total_penalty']))
-
-        return {
-            'results': {
-                'status': 'finished', 
-                'config': {'olympiad_id': olympiad_id, 'scoring': 'icpc'} # Можно попытаться сохранить scoring в БД отдельно, но пока так
-            }, 
-            'tasks': tasks_details,
-            'participants_list': participants_list
-        }
-
-    def create_tables(self):
-        c = self.conn.cursor()
-        c.execute('''CREATE TABLE IF NOT EXISTS tasks (
-                         id INTEGER PRIMARY KEY AUTOINCREMENT,
-                         title TEXT, difficulty TEXT, topic TEXT, description TEXT
-                       )''')
-        columns = [col[1] for col in c.execute("PRAGMA table_info(tasks)").fetchall()]
-        if "attachment" not in columns:
-            c.execute("ALTER TABLE tasks ADD COLUMN attachment BLOB")
-        if "file_format" not in columns:
-            c.execute("ALTER TABLE tasks ADD COLUMN file_format TEXT")
-        c.execute('''CREATE TABLE IF NOT EXISTS tests (
-                         id INTEGER PRIMARY KEY AUTOINCREMENT, task_id INTEGER,
-                         test_input TEXT, expected_output TEXT, time_limit REAL,
-                         FOREIGN KEY(task_id) REFERENCES tasks(id)
-                       )''')
-        c.execute('''CREATE TABLE IF NOT EXISTS submissions (
-                         id INTEGER PRIMARY KEY AUTOINCREMENT, task_id INTEGER,
-                         language TEXT, code TEXT, result TEXT,
-                         timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                         FOREIGN KEY(task_id) REFERENCES tasks(id)
-                       )''')
-        self.conn.commit()
- 
-
-    def get_whitelist_for_olympiad(self, olympiad_id):
-        c = self.conn.cursor()
-        c.execute("""
-            SELECT id, nickname, organization 
-            FROM olympiad_whitelist 
-            WHERE olympiad_id = ? 
-            ORDER BY nickname
-        """, (olympiad_id,))
-        return c.fetchall()
-
-    def add_participant_to_whitelist(self, olympiad_id, nickname, organization, password):
-        c = self.conn.cursor()
-        try:
-            c.execute("""
-                INSERT INTO olympiad_whitelist (olympiad_id, nickname, organization, password)
-                VALUES (?, ?, ?, ?)
-            """, (olympiad_id, nickname, organization, password))
-            self.conn.commit()
-            return (True, f"Участник {nickname} добавлен.")
-        except sqlite3.IntegrityError:
-            return (False, f"Ошибка: Участник {nickname} уже в списке этой олимпиады.")
-        except Exception as e:
-            return (False, f"Ошибка базы данных: {e}")
-
-    def remove_participant_from_whitelist(self, participant_db_id):
-        c = self.conn.cursor()
-        try:
-            c.execute("DELETE FROM olympiad_whitelist WHERE id = ?", (participant_db_id,))
-            self.conn.commit()
-            return c.rowcount > 0 
-        except Exception as e:
-            print(f"Ошибка при удалении участника: {e}")
-            return False
-
-    def validate_closed_participant(self, olympiad_id, nickname, password):
-        c = self.conn.cursor()
-        c.execute("""
-            SELECT * FROM olympiad_whitelist 
-            WHERE olympiad_id = ? AND nickname = ? AND password = ?
-        """, (olympiad_id, nickname, password))
-        return c.fetchone()
-        
-    def add_task(self, title, difficulty, topic, description, attachment, file_format):
-        c = self.conn.cursor()
-        c.execute("INSERT INTO tasks (title, difficulty, topic, description, attachment, file_format) VALUES (?,?,?,?,?,?)",
-                  (title, difficulty, topic, description, attachment, file_format))
-        self.conn.commit()
-
-    def get_tasks(self):
-        c = self.conn.cursor()
-        c.execute("SELECT id, title, difficulty, topic FROM tasks ORDER BY id DESC")
-        return c.fetchall()
-
-    def get_task_details(self, task_id):
-        c = self.conn.cursor()
-        c.execute("SELECT * FROM tasks WHERE id=?", (task_id,))
-        return c.fetchone()
-
-    def update_task(self, task_id, title, difficulty, topic, description, attachment, file_format):
-        c = self.conn.cursor()
-        if attachment and file_format:
-             c.execute("""UPDATE tasks SET title=?, difficulty=?, topic=?, description=?, attachment=?, file_format=? 
-                         WHERE id=?""",
-                       (title, difficulty, topic, description, attachment, file_format, task_id))
-        else:
-            c.execute("""UPDATE tasks SET title=?, difficulty=?, topic=?, description=?
-                         WHERE id=?""",
-                       (title, difficulty, topic, description, task_id))
-        self.conn.commit()
-
-
-    def delete_task(self, task_id):
-        c = self.conn.cursor()
-        c.execute("DELETE FROM tests WHERE task_id=?", (task_id,))
-        c.execute("DELETE FROM tasks WHERE id=?", (task_id,))
-        self.conn.commit()
-
-    def add_test(self, task_id, test_input, expected_output, time_limit):
-        c = self.conn.cursor()
-        c.execute("INSERT INTO tests (task_id, test_input, expected_output, time_limit) VALUES (?,?,?,?)",
-                  (task_id, test_input, expected_output, time_limit))
-        self.conn.commit()
-
-    def get_tests_for_task(self, task_id):
-        c = self.conn.cursor()
-        c.execute("SELECT id, test_input, expected_output, time_limit FROM tests WHERE task_id=?", (task_id,))
-        return c.fetchall()
-
-    def get_test_details(self, test_id):
-        c = self.conn.cursor()
-        c.execute("SELECT * FROM tests WHERE id=?", (test_id,))
-        return c.fetchone()
-
-    def update_test(self, test_id, test_input, expected_output, time_limit):
-        c = self.conn.cursor()
-        c.execute("""UPDATE tests SET test_input=?, expected_output=?, time_limit=? 
-                       WHERE id=?""", (test_input, expected_output, time_limit, test_id))
-        self.conn.commit()
-
-    def delete_test(self, test_id):
-        c = self.conn.cursor()
-        c.execute("DELETE FROM tests WHERE id=?", (test_id,))
-        self.conn.commit()
-    
-    def add_submission(self, task_id, language, code, result):
-        c = self.conn.cursor()
-        c.execute("INSERT INTO submissions (task_id, language, code, result) VALUES (?,?,?,?)",
-                  (task_id, language, code, result))
-        self.conn.commit()
-    # --- ДОБАВИТЬ ЭТОТ МЕТОД В КЛАСС DBManager ---
-    def get_participant_progress(self, olympiad_id, participant_uuid):
-        """Восстанавливает прогресс участника из базы данных, если он есть."""
-        c = self.conn.cursor()
-        
-        # 1. Достаем баллы и статус
-        c.execute("""
-            SELECT task_scores, disqualified, organization 
-            FROM olympiad_results 
-            WHERE olympiad_id = ? AND participant_uuid = ?
-        """, (olympiad_id, participant_uuid))
-        row_res = c.fetchone()
-        
-        if not row_res:
-            return None # Участника нет в базе
-            
-        # 2. Достаем сохраненный код (последние посылки)
-        c.execute("""
-            SELECT task_submissions 
-            FROM olympiad_submissions 
-            WHERE olympiad_id = ? AND participant_uuid = ?
-        """, (olympiad_id, participant_uuid))
-        row_sub = c.fetchone()
-        
-        scores = json.loads(row_res['task_scores'])
-        
-        # Если посылок нет (редкий случай), создаем пустой словарь
-        last_submissions = {}
-        if row_sub and row_sub['task_submissions']:
-            last_submissions = json.loads(row_sub['task_submissions'])
-            
-        return {
-            'scores': scores,
-            'disqualified': row_res['disqualified'],
-            'organization': row_res['organization'],
-            'last_submissions': last_submissions
-        }
-
-# --- "Пакетная" функция ---
-def _run_batch(code, test_data_list, language, judge_script, docker_image):
-    """
-    Выполняет "пакетную" проверку кода (1 запуск Docker на все тесты).
-    Возвращает (list_of_verdicts, global_error_string)
-    """
-    tmp_dir = None
-    try:
-        tmp_dir = tempfile.mkdtemp()
-        
-        code_filename = "script.py" if language == "Python" else "source.cpp"
-        judge_filename = "judge.py" 
-        tests_filename = "tests.json"
-
-        with open(os.path.join(tmp_dir, code_filename), "w", encoding="utf-8") as f:
-            f.write(code)
-        with open(os.path.join(tmp_dir, judge_filename), "w", encoding="utf-8") as f:
-            f.write(judge_script)
-        with open(os.path.join(tmp_dir, tests_filename), "w", encoding="utf-8") as f:
-            json.dump(test_data_list, f)
-            
-        abs_path = os.path.abspath(tmp_dir)
-        docker_path = _get_docker_path(abs_path)
-        docker_volume_arg = ["-v", f"{docker_path}:/home/appuser/run:ro"]
-        
-        total_time_limit = sum(float(t.get('limit', 1.0)) for t in test_data_list)
-        docker_total_timeout = total_time_limit + 15.0
-        
-        container_command = ["python3", "/home/appuser/run/judge.py"]
-        command = DOCKER_COMMON_ARGS + docker_volume_arg + [docker_image] + container_command
-
-        result = subprocess.run(
-            command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            timeout=docker_total_timeout
-        )
-        
-        output = result.stdout.decode('utf-8', errors='replace')
-        err = result.stderr.decode('utf-8', errors='replace')
-
-        if err:
-             return None, f"Docker/Judge Error: {err}"
-
-        try:
-            verdicts = json.loads(output)
-            if isinstance(verdicts, list) and len(verdicts) > 0 and verdicts[0].get("verdict") == "Compilation Error":
-                return None, verdicts[0].get("error", "Compilation Error")
-            
-            return verdicts, None
-        
-        except json.JSONDecodeError:
-            return None, f"JSON Decode Error. Raw output: {output}"
-
-    except subprocess.TimeoutExpired:
-        return None, "Time Limit Exceeded (Overall Timeout)"
-    except Exception as e:
-        return None, f"Docker execution error: {str(e)}"
-    finally:
-        if tmp_dir and os.path.exists(tmp_dir):
-            # Пытаемся удалить папку с повторами, так как Windows/Docker могут держать файлы
-            retries = 5
-            for i in range(retries):
-                try:
-                    shutil.rmtree(tmp_dir)
-                    break # Успех, выходим из цикла
-                except PermissionError:
-                    if i < retries - 1:
-                        time.sleep(0.2) # Ждем немного и пробуем снова
-                    else:
-                        print(f"WARNING: Не удалось удалить временную папку {tmp_dir} после {retries} попыток.")
-                except Exception as e:
-                    print(f"ERROR: Ошибка при удалении {tmp_dir}: {e}")
-                    break
-
-# --- Новая функция-обертка для Python ---
-def run_python(code, test_data_list):
-    """
-    Принимает код и СПИСОК тестов.
-    Возвращает (list_of_verdicts, global_error_string)
-    """
-    return _run_batch(code, test_data_list, "Python", JUDGE_SCRIPT_PYTHON, DOCKER_IMAGE_PYTHON)
-
-# --- Новая функция-обертка для C++ ---
-def run_cpp(code, test_data_list):
-    """
-    Принимает код и СПИСОК тестов.
-    Возвращает (list_of_verdicts, global_error_string)
-    """
-    return _run_batch(code, test_data_list, "C++", JUDGE_SCRIPT_CPP, DOCKER_IMAGE_CPP)
\ No newline at end of file
+import sys
+import os
+import sqlite3
+import subprocess
+import tempfile
+import json
+import platform
+import shutil 
+import time
+import threading
+import base64
+from container_pool import ContainerPool
+from compile_cache import CompileCache
+from test_store import TestStore
+from scratch import ScratchPool, default_scratch_root
+import docker_backend
+# НАСТРОЙКИ БЕЗОПАСНОСТИ DOCKER
+DOCKER_IMAGE_PYTHON = "testirovschik-python"
+DOCKER_IMAGE_CPP = "testirovschik-cpp"
+
+DOCKER_COMMON_ARGS = [
+    "docker", "run",
+    "--rm",             
+    # "-i" больше не нужен
+    "--network=none",   
+    "--memory=256m",    
+    "--cpus=1.0",       
+    "--pids-limit=10",  
+    "--user=appuser",   
+    "-w", "/home/appuser/run" 
+]
+DOCKER_RUN_DIR = "/home/appuser/run"
+
+# Пулы "теплых" контейнеров (образ -> ContainerPool). Пусты, пока не вызван init_container_pools
+_container_pools = {}
+
+# Максимум тестов, которые судья запускает одновременно внутри одного контейнера
+# (ограничен --pids-limit: судья + sleep пула + запущенные тесты)
+JUDGE_MAX_WORKERS = 4
+
+# Лимит памяти теста по умолчанию (МБ), если в таблице tests он не задан
+DEFAULT_MEMORY_LIMIT_MB = 256
+
+# Лимит размера вывода программы (больше - "Output Limit Exceeded") и сколько
+# вывода судья возвращает хосту вместе с вердиктом
+OUTPUT_LIMIT_KB = 16 * 1024
+OUTPUT_PREVIEW_BYTES = 64 * 1024
+
+# Как судья запускает тесты Python: "spawn" - новый интерпретатор на каждый тест,
+# "zygote" - форк заранее запущенного интерпретатора (см. ZYGOTE_SCRIPT_PYTHON)
+PYTHON_EXECUTORS = ("spawn", "zygote")
+_python_executor = "spawn"
+
+# Флаги компилятора C++. Входят в ключ кэша компиляции, поэтому задаются только здесь
+CPP_COMPILE_FLAGS = ["-O2", "-std=c++17"]
+
+# Начало global_err при ошибке компиляции (C++ или синтаксис Python)
+COMPILATION_ERROR_PREFIX = "Compilation Error:"
+
+# Кэш скомпилированных C++ программ (None, пока не вызван init_compile_cache)
+_compile_cache = None
+_image_ids = {}
+
+# Хранилище тестов на хосте и точка его монтирования в контейнерах (только чтение)
+TEST_STORE_DIR = "test_store"
+TEST_STORE_MOUNT = "/home/appuser/tests"
+_test_store = None
+
+# Рабочие папки посылок на хосте (по умолчанию в памяти, см. ScratchPool)
+SCRATCH_MAX_MB = 256
+_scratch = None
+
+# /tmp контейнера (бинарник C++, вывод тестов) - tmpfs такого размера.
+# Судья держит одновременно вывод и stderr JUDGE_MAX_WORKERS тестов (до OUTPUT_LIMIT_KB каждый)
+CONTAINER_TMPFS_MB = 160
+
+# --- Общая часть "внутреннего судьи": загрузка тестов и прогон ---
+# Скрипты для Python и C++ ниже отличаются только подготовкой (компиляцией)
+# и командой запуска программы участника.
+JUDGE_SCRIPT_COMMON = """
+import sys
+import os
+import json
+import subprocess
+import time
+import shutil
+import base64
+import math
+import signal
+import resource
+import codecs
+
+# Режим "до первой ошибки": остальные тесты не запускаем, если исход уже ясен
+STOP_ON_FAIL = os.environ.get('JUDGE_STOP_ON_FAIL') == '1'
+# Сколько тестов запускать одновременно
+WORKERS = max(1, int(os.environ.get('JUDGE_WORKERS', '1')))
+# Лимит памяти теста по умолчанию (МБ), если в тесте он не задан
+DEFAULT_MEMORY_LIMIT_MB = int(os.environ.get('JUDGE_DEFAULT_MEMORY_MB', '256'))
+# Запас адресного пространства сверх лимита памяти: виртуальной памяти процессу
+# нужно больше, чем реально занятой (библиотеки, стек, арены malloc)
+ADDRESS_SPACE_HEADROOM_MB = 64
+# Запас стенных часов сверх лимита: на запуск интерпретатора и ожидание ввода-вывода
+WALL_TIME_GRACE = 0.5
+# Максимальный размер вывода программы (stdout и stderr отдельно), байт
+OUTPUT_LIMIT = int(os.environ.get('JUDGE_OUTPUT_LIMIT_KB', '16384')) * 1024
+# Сколько байт вывода и ошибок отдаем хосту вместе с вердиктом
+PREVIEW_BYTES = int(os.environ.get('JUDGE_PREVIEW_BYTES', '65536'))
+# Размер куска при потоковом сравнении вывода с ответом
+CHUNK_SIZE = 64 * 1024
+
+def emit(message):
+    # Судья общается с хостом построчно (один JSON-объект на строку),
+    # чтобы хост мог показывать результаты тестов по мере готовности
+    print(json.dumps(message), flush=True)
+
+# Тесты лежат в общем хранилище (смонтировано только для чтения):
+# sets/<набор>.json описывает тесты, blobs/<sha256> - сами входы и выходы
+TESTS_ROOT = os.environ.get('JUDGE_TESTS_ROOT', '')
+TEST_SET = os.environ.get('JUDGE_TEST_SET', '')
+
+def blob_path(name):
+    return os.path.join(TESTS_ROOT, 'blobs', name)
+
+def test_time_limit(test):
+    return float(test.get('limit') or 1.0)
+
+def test_memory_limit_kb(test):
+    return int(test.get('memory_limit') or DEFAULT_MEMORY_LIMIT_MB) * 1024
+
+class RunningTest:
+    def __init__(self, index, test, process, paths):
+        self.index = index
+        # Лимит времени проверяется по процессорному времени, поэтому допустимы и доли секунды
+        self.time_limit = test_time_limit(test)
+        self.memory_limit_kb = test_memory_limit_kb(test)
+        self.expected_path = blob_path(test['output'])
+        self.process = process
+        self.paths = paths
+        self.start_time = time.monotonic()
+        # Пока тесты идут параллельно, они делят процессор контейнера, поэтому
+        # стенные часы даем с запасом, а честный лимит проверяем по процессорному времени
+        self.deadline = self.start_time + self.time_limit * WORKERS + WALL_TIME_GRACE
+        self.timed_out = False
+
+def test_rlimits(test):
+    # Жесткий лимит процессорного времени на случай, если стенные часы даны с запасом,
+    # лимит адресного пространства и размера файла вывода (в байтах).
+    # Размер файла разрешаем на байт больше лимита, чтобы превышение было видно
+    cpu_limit = math.ceil(test_time_limit(test)) + 1
+    address_space = (test_memory_limit_kb(test) // 1024 + ADDRESS_SPACE_HEADROOM_MB) * 1024 * 1024
+    return cpu_limit, address_space, OUTPUT_LIMIT + 1
+
+def limits_setter(test):
+    # Функция, которая выставляет лимиты в дочернем процессе до запуска программы участника
+    cpu_limit, address_space, file_size = test_rlimits(test)
+
+    def set_limits():
+        # Маска сигналов наследуется при exec - возвращаем программе участника SIGCHLD
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, [signal.SIGCHLD])
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, cpu_limit + 1))
+        resource.setrlimit(resource.RLIMIT_AS, (address_space, address_space))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (file_size, file_size))
+    return set_limits
+
+def start_test(index, test, run_command, spawn=None):
+    paths = {name: f'/tmp/test_{index}.{name}' for name in ('out', 'err')}
+
+    if spawn is not None:
+        # Другой способ запуска (например, zygote для Python)
+        process = spawn(test, blob_path(test['input']), paths)
+        return RunningTest(index, test, process, paths)
+
+    # Вход подаем прямо из файла хранилища, без копирования
+    with open(blob_path(test['input']), 'rb') as stdin, open(paths['out'], 'wb') as stdout, open(paths['err'], 'wb') as stderr:
+        process = subprocess.Popen(run_command, stdin=stdin, stdout=stdout, stderr=stderr,
+                                   preexec_fn=limits_setter(test))
+    return RunningTest(index, test, process, paths)
+
+def is_out_of_memory(running, return_code, peak_kb, error):
+    if peak_kb > running.memory_limit_kb:
+        return True
+    # Упершись в лимит адресного пространства, программа не получает память и падает
+    return return_code != 0 and ('MemoryError' in error or 'bad_alloc' in error)
+
+def read_preview(path, from_end=False):
+    # Начало (или конец) файла не длиннее PREVIEW_BYTES и признак того, что файл обрезан
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        if from_end and size > PREVIEW_BYTES:
+            f.seek(size - PREVIEW_BYTES)
+        data = f.read(PREVIEW_BYTES)
+    return data.decode('utf-8', errors='replace'), size > PREVIEW_BYTES
+
+def normalized_chunks(path):
+    # Текст файла кусками, с заменой \\r\\n на \\n - как replace() для всего файла сразу
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    carry = ''
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(CHUNK_SIZE)
+            text = carry + decoder.decode(data, final=not data)
+            carry = ''
+            if data and text.endswith('\\r'):
+                # \\r в конце куска может оказаться началом \\r\\n в следующем
+                text, carry = text[:-1], '\\r'
+            if text:
+                yield text.replace('\\r\\n', '\\n')
+            if not data:
+                break
+
+def significant_chunks(chunks):
+    # Потоковый аналог strip(): пробельные символы в начале пропускаем, а пробельные
+    # символы в конце куска придерживаем, пока не станет ясно, что за ними что-то есть
+    started = False
+    pending = []
+    for chunk in chunks:
+        if not started:
+            chunk = chunk.lstrip()
+            if not chunk:
+                continue
+            started = True
+        body = chunk.rstrip()
+        if body:
+            if pending:
+                yield ''.join(pending)
+                pending = []
+            yield body
+        if len(body) < len(chunk):
+            pending.append(chunk[len(body):])
+
+def outputs_match(output_path, expected_path):
+    # То же, что out.replace('\\r\\n', '\\n').strip() == exp.replace('\\r\\n', '\\n').strip(),
+    # но без чтения обоих файлов в память целиком
+    out_chunks = significant_chunks(normalized_chunks(output_path))
+    exp_chunks = significant_chunks(normalized_chunks(expected_path))
+    out_buf = exp_buf = ''
+    while True:
+        if not out_buf:
+            out_buf = next(out_chunks, None)
+        if not exp_buf:
+            exp_buf = next(exp_chunks, None)
+        if out_buf is None or exp_buf is None:
+            return out_buf is None and exp_buf is None
+        n = min(len(out_buf), len(exp_buf))
+        if out_buf[:n] != exp_buf[:n]:
+            return False
+        out_buf = out_buf[n:]
+        exp_buf = exp_buf[n:]
+
+def finish_test(running, status, rusage):
+    running.process.returncode = os.waitstatus_to_exitcode(status)
+    wall_time = time.monotonic() - running.start_time
+    cpu_time = rusage.ru_utime + rusage.ru_stime
+    # Пиковый объем резидентной памяти процесса (в Linux - в килобайтах).
+    # Сюда входят и несколько МБ копии судьи между fork и exec
+    peak_kb = rusage.ru_maxrss
+
+    output_size = os.path.getsize(running.paths['out'])
+    error_size = os.path.getsize(running.paths['err'])
+    output, output_truncated = read_preview(running.paths['out'])
+    # Из потока ошибок полезнее конец (последние строки traceback)
+    error, error_truncated = read_preview(running.paths['err'], from_end=True)
+
+    return_code = running.process.returncode
+    verdict = ""
+    
+    try:
+        if return_code == -signal.SIGXFSZ or max(output_size, error_size) > OUTPUT_LIMIT:
+            verdict = "Output Limit Exceeded"
+        elif running.timed_out or cpu_time > running.time_limit or return_code == -signal.SIGXCPU:
+            verdict = "Time Limit Exceeded"
+        elif is_out_of_memory(running, return_code, peak_kb, error):
+            verdict = "Memory Limit Exceeded"
+        elif return_code != 0:
+            verdict = "Runtime Error"
+        elif outputs_match(running.paths['out'], running.expected_path):
+            verdict = "Accepted"
+        else:
+            verdict = "Wrong Answer"
+    finally:
+        for path in running.paths.values():
+            os.remove(path)
+    
+    return {
+        "test_num": running.index + 1,
+        "verdict": verdict,
+        "cpu_time": round(cpu_time, 3),
+        "wall_time": round(wall_time, 3),
+        "memory_kb": peak_kb,
+        "output": output,
+        "output_truncated": output_truncated,
+        "error": error,
+        "error_truncated": error_truncated
+    }
+
+def run_tests(run_command, spawn=None):
+    try:
+        with open(os.path.join(TESTS_ROOT, 'sets', TEST_SET + '.json'), 'r') as f:
+            tests = json.load(f)
+    except Exception as e:
+        emit({"verdict": "Internal Error", "error": f"Failed to read test set {TEST_SET}: {e}"})
+        return
+
+    # Завершение детей ждем через sigtimedwait, поэтому SIGCHLD блокируем
+    signal.pthread_sigmask(signal.SIG_BLOCK, [signal.SIGCHLD])
+
+    pending = list(enumerate(tests))
+    running = {}
+    results = {}
+    first_fail = None
+    next_to_emit = 0
+
+    while running or (pending and first_fail is None):
+        # 1. Запускаем тесты, пока есть свободные "потоки"
+        while pending and len(running) < WORKERS and first_fail is None:
+            index, test = pending.pop(0)
+            try:
+                test_run = start_test(index, test, run_command, spawn)
+                running[test_run.process.pid] = test_run
+            except Exception as e:
+                results[index] = {"test_num": index + 1, "verdict": "Internal Error", "output": "", "error": str(e)}
+                if STOP_ON_FAIL:
+                    first_fail = index if first_fail is None else min(first_fail, index)
+
+        if not running:
+            continue
+
+        # 2. Ждем завершения любого теста или ближайшего дедлайна
+        wait_time = min(r.deadline for r in running.values()) - time.monotonic()
+        if wait_time > 0:
+            signal.sigtimedwait([signal.SIGCHLD], wait_time)
+
+        # 3. Собираем завершившиеся процессы
+        while running:
+            pid, status, rusage = os.wait4(-1, os.WNOHANG)
+            if pid == 0:
+                break
+            test_run = running.pop(pid, None)
+            if test_run is None:
+                continue
+            try:
+                results[test_run.index] = finish_test(test_run, status, rusage)
+            except Exception as e:
+                results[test_run.index] = {"test_num": test_run.index + 1, "verdict": "Internal Error", "output": "", "error": str(e)}
+
+            if STOP_ON_FAIL and results[test_run.index]["verdict"] != "Accepted":
+                if first_fail is None or test_run.index < first_fail:
+                    first_fail = test_run.index
+                # Тесты с большими номерами уже не важны
+                for other in running.values():
+                    if other.index > first_fail:
+                        other.process.kill()
+
+        # Отдаем хосту готовые результаты строго по порядку номеров тестов
+        while next_to_emit in results and (first_fail is None or next_to_emit <= first_fail):
+            emit(results[next_to_emit])
+            next_to_emit += 1
+
+        # 4. Убиваем тех, кто вышел за дедлайн
+        now = time.monotonic()
+        for test_run in running.values():
+            if now >= test_run.deadline and not test_run.timed_out:
+                test_run.timed_out = True
+                test_run.process.kill()
+
+    # Тесты, упавшие при запуске, могли не попасть в цикл ожидания
+    while next_to_emit in results and (first_fail is None or next_to_emit <= first_fail):
+        emit(results[next_to_emit])
+        next_to_emit += 1
+"""
+
+# --- Скрипт "внутреннего судьи" для Python ---
+JUDGE_SCRIPT_PYTHON = JUDGE_SCRIPT_COMMON + """
+PR_SET_CHILD_SUBREAPER = 36
+
+class ForkedProcess:
+    # Процесс теста, порожденный zygote (вместо subprocess.Popen)
+    def __init__(self, pid):
+        self.pid = pid
+        self.returncode = None
+
+    def kill(self):
+        try:
+            os.kill(self.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+class Zygote:
+    # Отдельный заранее запущенный интерпретатор, который форкает процесс на каждый тест.
+    # Форкаем именно его, а не судью: в памяти судьи есть пути к ожидаемым ответам
+    def __init__(self, script_path, bytecode_path):
+        self.process = subprocess.Popen(['python3', script_path, bytecode_path], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        preexec_fn=lambda: signal.pthread_sigmask(signal.SIG_UNBLOCK, [signal.SIGCHLD]))
+
+    def spawn(self, test, input_path, paths):
+        cpu_limit, address_space, file_size = test_rlimits(test)
+        request = '\\t'.join([str(cpu_limit), str(address_space), str(file_size), input_path, paths['out'], paths['err']])
+        self.process.stdin.write((request + '\\n').encode('utf-8'))
+        self.process.stdin.flush()
+        reply = self.process.stdout.readline()
+        pid = int(reply) if reply.strip() else -1
+        if pid <= 0:
+            raise RuntimeError("zygote failed to start the test")
+        return ForkedProcess(pid)
+
+    def close(self):
+        self.process.stdin.close()
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+def start_zygote(bytecode_path):
+    # Процессы тестов zygote отдает "внукам", поэтому судья должен стать для них
+    # subreaper'ом - тогда их завершение (и rusage) придет в os.wait4 судьи
+    script_path = os.environ.get('JUDGE_ZYGOTE')
+    if not script_path:
+        return None
+    try:
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.prctl(PR_SET_CHILD_SUBREAPER, 1, 0, 0, 0) != 0:
+            return None
+        return Zygote(script_path, bytecode_path)
+    except Exception:
+        return None
+
+BYTECODE_PATH = '/tmp/script.pyc'
+
+def compile_script():
+    # Синтаксис проверяем один раз: при ошибке тесты не запускаем вовсе.
+    # Тесты потом выполняют готовый байткод, не компилируя исходник заново
+    import py_compile
+    import traceback
+    script_path = os.path.abspath('script.py')
+    try:
+        py_compile.compile('script.py', cfile=BYTECODE_PATH, dfile=script_path, doraise=True)
+        return None
+    except py_compile.PyCompileError as e:
+        error = e.exc_value
+        lines = traceback.format_exception_only(type(error), error)
+        return ''.join(lines).replace(f'File "{script_path}", ', '').strip()
+
+def run_judge():
+    error_msg = compile_script()
+    if error_msg is not None:
+        emit({"verdict": "Compilation Error", "error": error_msg})
+        emit({"done": True})
+        return
+
+    zygote = start_zygote(BYTECODE_PATH)
+    try:
+        run_tests(['python3', BYTECODE_PATH], spawn=zygote.spawn if zygote else None)
+    finally:
+        if zygote:
+            zygote.close()
+    emit({"done": True})
+
+if __name__ == "__main__":
+    run_judge()
+"""
+
+# --- Zygote для Python: чистый интерпретатор, который форкает процесс на каждый тест ---
+# Получает от судьи строки "лимит_CPU<TAB>лимит_памяти<TAB>лимит_файла<TAB>вход<TAB>выход<TAB>ошибки"
+# и отвечает PID процесса теста. Экономит запуск интерпретатора (~20-40 мс) на каждом тесте.
+ZYGOTE_SCRIPT_PYTHON = """
+import os
+import sys
+import signal
+import resource
+import builtins
+import traceback
+
+RUN_DIR = os.getcwd()
+SCRIPT_PATH = os.path.join(RUN_DIR, 'script.py')
+# Байткод, который судья уже скомпилировал на этапе проверки синтаксиса
+BYTECODE_PATH = sys.argv[1] if len(sys.argv) > 1 else None
+
+def load_program():
+    # Загружаем код участника один раз на все тесты
+    try:
+        if BYTECODE_PATH:
+            import marshal
+            with open(BYTECODE_PATH, 'rb') as f:
+                # 16 байт - заголовок .pyc (магическое число, флаги, метка исходника)
+                return marshal.loads(f.read()[16:]), None
+        with open(SCRIPT_PATH, 'rb') as f:
+            return compile(f.read(), SCRIPT_PATH, 'exec'), None
+    except Exception as e:
+        return None, e
+
+def exit_status(code):
+    # Те же коды выхода, что у обычного python3 script.py
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code & 0xFF
+    print(code, file=sys.stderr)
+    return 1
+
+def execute(program, load_error):
+    if program is None:
+        traceback.print_exception(type(load_error), load_error, None)
+        return 1
+
+    main_globals = {'__name__': '__main__', '__file__': SCRIPT_PATH, '__builtins__': builtins,
+                    '__doc__': None, '__package__': None, '__spec__': None, '__loader__': None}
+    try:
+        exec(program, main_globals)
+        return 0
+    except SystemExit as e:
+        return exit_status(e.code)
+    except BaseException as e:
+        # Кадр самого zygote участнику не показываем
+        tb = e.__traceback__.tb_next if e.__traceback__ else None
+        traceback.print_exception(type(e), e, tb)
+        return 1
+
+def run_test(fields, program, load_error):
+    cpu_limit, address_space, file_size, input_path, output_path, error_path = fields
+
+    # 1. Стандартные потоки - файлы теста, все остальные дескрипторы zygote закрываем
+    fds = [os.open(input_path, os.O_RDONLY),
+           os.open(output_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644),
+           os.open(error_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)]
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+    os.closerange(3, os.sysconf('SC_OPEN_MAX'))
+
+    # 2. Лимиты, сигналы и рабочая папка - как у отдельного процесса
+    signal.pthread_sigmask(signal.SIG_SETMASK, [])
+    resource.setrlimit(resource.RLIMIT_CPU, (int(cpu_limit), int(cpu_limit) + 1))
+    resource.setrlimit(resource.RLIMIT_AS, (int(address_space), int(address_space)))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (int(file_size), int(file_size)))
+    os.chdir(RUN_DIR)
+
+    sys.stdin = open(0, 'r', encoding='utf-8', closefd=False)
+    sys.stdout = open(1, 'w', encoding='utf-8', closefd=False)
+    sys.stderr = open(2, 'w', encoding='utf-8', errors='backslashreplace', closefd=False, buffering=1)
+    sys.argv = ['script.py']
+    sys.path[0] = RUN_DIR
+
+    exit_code = execute(program, load_error)
+
+    # 3. Завершение как у интерпретатора: atexit, потоки, сброс буферов
+    try:
+        import atexit
+        atexit._run_exitfuncs()
+        if 'threading' in sys.modules:
+            sys.modules['threading']._shutdown()
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except BaseException:
+        exit_code = exit_code or 1
+    os._exit(exit_code)
+
+def main():
+    program, load_error = load_program()
+    requests = sys.stdin.buffer
+    reply_fd = sys.stdout.fileno()
+
+    while True:
+        line = requests.readline()
+        if not line:
+            break
+        fields = line.decode('utf-8').rstrip('\\n').split('\\t')
+
+        # Двойной fork: промежуточный процесс сразу выходит, и процесс теста
+        # достается судье (он subreaper), который ждет его через os.wait4
+        middle = os.fork()
+        if middle == 0:
+            pid = -1
+            try:
+                pid = os.fork()
+                if pid == 0:
+                    try:
+                        run_test(fields, program, load_error)
+                    finally:
+                        os._exit(1)
+            finally:
+                os.write(reply_fd, f"{pid}\\n".encode('ascii'))
+                os._exit(0)
+        os.waitpid(middle, 0)
+
+if __name__ == "__main__":
+    main()
+"""
+
+# --- Скрипт "внутреннего судьи" для C++ (ИСПРАВЛЕН) ---
+JUDGE_SCRIPT_CPP = JUDGE_SCRIPT_COMMON + """
+def run_judge():
+    # 1. Компиляция (ОДИН РАЗ)
+    if os.path.exists('a.out'):
+        # Хост передал готовый бинарник из кэша компиляции
+        shutil.copyfile('a.out', '/tmp/a.out')
+        os.chmod('/tmp/a.out', 0o755)
+    else:
+        try:
+            # --- ИСПРАВЛЕНИЕ 1: Компилируем в /tmp/a.out ---
+            compile_proc = subprocess.run(
+                ['g++', 'source.cpp', '-o', '/tmp/a.out'] + __CPP_COMPILE_FLAGS__,
+                capture_output=True, text=True, timeout=10
+            )
+        except subprocess.TimeoutExpired:
+            emit({"verdict": "Compilation Error", "error": "Compilation timed out (> 10s)", "cacheable": False})
+            emit({"done": True})
+            return
+
+        if compile_proc.returncode != 0:
+            error_msg = compile_proc.stderr.replace("source.cpp:", "line ")
+            emit({"verdict": "Compilation Error", "error": error_msg})
+            emit({"done": True})
+            return
+
+        # Отдаем бинарник хосту для кэша ДО запуска кода участника
+        with open('/tmp/a.out', 'rb') as f:
+            emit({"compiled": base64.b64encode(f.read()).decode('ascii')})
+
+    # 2. Прогоняем тесты (--- ИСПРАВЛЕНИЕ 2: Запускаем /tmp/a.out ---)
+    run_tests(['/tmp/a.out'])
+    emit({"done": True})
+
+if __name__ == "__main__":
+    run_judge()
+""".replace("__CPP_COMPILE_FLAGS__", repr(CPP_COMPILE_FLAGS))
+
+def _get_docker_path(abs_path):
+    r"""Конвертирует путь Windows (C:\...) в /c/... для Docker."""
+    if platform.system() == "Windows":
+         abs_path = abs_path.replace("\\", "/")
+         if abs_path[1] == ":":
+            abs_path = "/" + abs_path[0].lower() + abs_path[2:]
+    return abs_path
+
+class DBManager:
+    # Сколько последних вердиктов хранится в таблице verdict_cache
+    VERDICT_CACHE_MAX_ROWS = 20000
+
+    def __init__(self, db_name="testirovschik.db"):
+        self.db_name = db_name
+        self.conn = sqlite3.connect(self.db_name, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.create_tables()
+        self._create_olympiad_tables()
+
+    def _create_olympiad_tables(self):
+        c = self.conn.cursor()
+        c.execute('''CREATE TABLE IF NOT EXISTS olympiad_results (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        olympiad_id TEXT NOT NULL,
+                        participant_uuid TEXT NOT NULL,
+                        nickname TEXT NOT NULL,
+                        total_score INTEGER,
+                        task_scores TEXT, 
+                        UNIQUE(olympiad_id, participant_uuid)
+                    )''')
+
+        c.execute("PRAGMA table_info(olympiad_results)")
+        columns = [col[1] for col in c.fetchall()]
+        if "organization" not in columns:
+            print("INFO: Updating database. Adding 'organization' column to 'olympiad_results' table.")
+            c.execute("ALTER TABLE olympiad_results ADD COLUMN organization TEXT")
+            
+        c.execute("PRAGMA table_info(olympiad_results)")
+        columns = [col[1] for col in c.fetchall()]
+        if "disqualified" not in columns:
+            print("INFO: Updating database. Adding 'disqualified' column to 'olympiad_results' table.")
+            c.execute("ALTER TABLE olympiad_results ADD COLUMN disqualified BOOLEAN DEFAULT 0")
+
+        c.execute('''CREATE TABLE IF NOT EXISTS olympiad_submissions (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        olympiad_id TEXT NOT NULL,
+                        participant_uuid TEXT NOT NULL,
+                        nickname TEXT NOT NULL,
+                        task_submissions TEXT, 
+                        UNIQUE(olympiad_id, participant_uuid)
+                    )''')
+        
+        c.execute('''CREATE TABLE IF NOT EXISTS olympiad_whitelist (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        olympiad_id TEXT NOT NULL,
+                        nickname TEXT NOT NULL,
+                        organization TEXT,
+                        password TEXT NOT NULL,
+                        UNIQUE(olympiad_id, nickname) 
+                    )''')
+        self.conn.commit()
+
+    def save_olympiad_data(self, olympiad_id, olympiad_data):
+        c = self.conn.cursor()
+        participants = olympiad_data.get('participants', {})
+        for p_uuid, p_data in participants.items():
+            nickname = p_data.get('nickname')
+            organization = p_data.get('organization', None) 
+            disqualified = p_data.get('disqualified', False)
+            scores = p_data.get('scores', {})
+            
+            total_score = 0
+            
+            total_score = sum(s.get('score', 0) for s in scores.values())
+
+            task_scores_json = json.dumps(scores) 
+            # -------------------------------
+            
+            c.execute("""
+                INSERT INTO olympiad_results (olympiad_id, participant_uuid, nickname, organization, total_score, task_scores, disqualified)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(olympiad_id, participant_uuid) DO UPDATE SET
+                organization=excluded.organization, total_score=excluded.total_score, task_scores=excluded.task_scores,
+                disqualified=excluded.disqualified
+            """, (olympiad_id, p_uuid, nickname, organization, total_score, task_scores_json, disqualified))
+            submissions = p_data.get('last_submissions', {})
+            submissions_json = json.dumps(submissions)
+            c.execute("""
+                INSERT INTO olympiad_submissions (olympiad_id, participant_uuid, nickname, task_submissions)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(olympiad_id, participant_uuid) DO UPDATE SET
+                task_submissions=excluded.task_submissions
+            """, (olympiad_id, p_uuid, nickname, submissions_json))
+        self.conn.commit()
+        
+    def get_olympiad_results(self, olympiad_id):
+        c = self.conn.cursor()
+        c.execute("""
+            SELECT participant_uuid, nickname, organization, total_score, task_scores, disqualified
+            FROM olympiad_results WHERE olympiad_id = ?
+        """, (olympiad_id,)) # Убрали ORDER BY здесь, отсортируем в Python
+        
+        participants_raw = c.fetchall()
+        if not participants_raw:
+            return None 
+
+        participants_list = []
+        task_ids = set()
+        
+        for p in participants_raw:
+            # BUGFIX #3: Читаем полный JSON
+            scores_full = json.loads(p['task_scores']) 
+            
+            # Собираем ID задач для заголовка таблицы
+            task_ids.update(scores_full.keys())
+            
+            # Пересчитываем итоговые штрафы/баллы, так как в базе в total_score лежит только сумма очков
+            total_score_calc = 0
+            total_penalty_calc = 0
+            
+            # Проходимся по задачам и считаем итоги
+            for tid, info in scores_full.items():
+                # Если старый формат базы (просто число), обрабатываем (на всякий случай)
+                if isinstance(info, int):
+                    info = {'score': info, 'attempts': 0, 'passed': False, 'penalty': 0}
+                    scores_full[tid] = info # Обновляем до словаря
+                
+                total_score_calc += info.get('score', 0)
+                if info.get('passed'):
+                    total_penalty_calc += info.get('penalty', 0)
+
+            participants_list.append({
+                'nickname': p['nickname'],
+                'organization': p['organization'],
+                'scores': scores_full, # Теперь тут есть и штрафы, и попытки
+                'total_score': total_score_calc,
+                'total_penalty': total_penalty_calc,
+                'disqualified': p['disqualified'] 
+            })
+            
+        # Получаем детали задач
+        task_ids_list = sorted(list(task_ids), key=int)
+        tasks_details = [self.get_task_details(tid) for tid in task_ids_list]
+        
+        # Сортировка (ICPC или по очкам) - делаем "умную" сортировку
+        # Сначала по очкам (убывание), потом по штрафам (возрастание)
+        participants_list.sort(key=lambda p: (-p['total_score'], p['total_penalty']))
+
+        return {
+            'results': {
+                'status': 'finished', 
+                'config': {'olympiad_id': olympiad_id, 'scoring': 'icpc'} # Можно попытаться сохранить scoring в БД отдельно, но пока так
+            }, 
+            'tasks': tasks_details,
+            'participants_list': participants_list
+        }
+
+    def create_tables(self):
+        c = self.conn.cursor()
+        c.execute('''CREATE TABLE IF NOT EXISTS tasks (
+                         id INTEGER PRIMARY KEY AUTOINCREMENT,
+                         title TEXT, difficulty TEXT, topic TEXT, description TEXT
+                       )''')
+        columns = [col[1] for col in c.execute("PRAGMA table_info(tasks)").fetchall()]
+        if "attachment" not in columns:
+            c.execute("ALTER TABLE tasks ADD COLUMN attachment BLOB")
+        if "file_format" not in columns:
+            c.execute("ALTER TABLE tasks ADD COLUMN file_format TEXT")
+        if "judge_workers" not in columns:
+            c.execute("ALTER TABLE tasks ADD COLUMN judge_workers INTEGER DEFAULT 1")
+        c.execute('''CREATE TABLE IF NOT EXISTS tests (
+                         id INTEGER PRIMARY KEY AUTOINCREMENT, task_id INTEGER,
+                         test_input TEXT, expected_output TEXT, time_limit REAL,
+                         FOREIGN KEY(task_id) REFERENCES tasks(id)
+                       )''')
+        columns = [col[1] for col in c.execute("PRAGMA table_info(tests)").fetchall()]
+        if "memory_limit" not in columns:
+            print("INFO: Updating database. Adding 'memory_limit' column to 'tests' table.")
+            c.execute("ALTER TABLE tests ADD COLUMN memory_limit INTEGER")
+        columns = [col[1] for col in c.execute("PRAGMA table_info(tasks)").fetchall()]
+        if "tests_version" not in columns:
+            c.execute("ALTER TABLE tasks ADD COLUMN tests_version INTEGER DEFAULT 0")
+        c.execute('''CREATE TABLE IF NOT EXISTS verdict_cache (
+                         id INTEGER PRIMARY KEY AUTOINCREMENT,
+                         cache_key TEXT UNIQUE NOT NULL, task_id INTEGER,
+                         verdicts TEXT, global_err TEXT
+                       )''')
+        c.execute('''CREATE TABLE IF NOT EXISTS submissions (
+                         id INTEGER PRIMARY KEY AUTOINCREMENT, task_id INTEGER,
+                         language TEXT, code TEXT, result TEXT,
+                         timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                         FOREIGN KEY(task_id) REFERENCES tasks(id)
+                       )''')
+        self.conn.commit()
+ 
+
+    def get_whitelist_for_olympiad(self, olympiad_id):
+        c = self.conn.cursor()
+        c.execute("""
+            SELECT id, nickname, organization 
+            FROM olympiad_whitelist 
+            WHERE olympiad_id = ? 
+            ORDER BY nickname
+        """, (olympiad_id,))
+        return c.fetchall()
+
+    def add_participant_to_whitelist(self, olympiad_id, nickname, organization, password):
+        c = self.conn.cursor()
+        try:
+            c.execute("""
+                INSERT INTO olympiad_whitelist (olympiad_id, nickname, organization, password)
+                VALUES (?, ?, ?, ?)
+            """, (olympiad_id, nickname, organization, password))
+            self.conn.commit()
+            return (True, f"Участник {nickname} добавлен.")
+        except sqlite3.IntegrityError:
+            return (False, f"Ошибка: Участник {nickname} уже в списке этой олимпиады.")
+        except Exception as e:
+            return (False, f"Ошибка базы данных: {e}")
+
+    def remove_participant_from_whitelist(self, participant_db_id):
+        c = self.conn.cursor()
+        try:
+            c.execute("DELETE FROM olympiad_whitelist WHERE id = ?", (participant_db_id,))
+            self.conn.commit()
+            return c.rowcount > 0 
+        except Exception as e:
+            print(f"Ошибка при удалении участника: {e}")
+            return False
+
+    def validate_closed_participant(self, olympiad_id, nickname, password):
+        c = self.conn.cursor()
+        c.execute("""
+            SELECT * FROM olympiad_whitelist 
+            WHERE olympiad_id = ? AND nickname = ? AND password = ?
+        """, (olympiad_id, nickname, password))
+        return c.fetchone()
+        
+    def add_task(self, title, difficulty, topic, description, attachment, file_format, judge_workers=1):
+        c = self.conn.cursor()
+        c.execute("INSERT INTO tasks (title, difficulty, topic, description, attachment, file_format, judge_workers) VALUES (?,?,?,?,?,?,?)",
+                  (title, difficulty, topic, description, attachment, file_format, judge_workers))
+        self.conn.commit()
+
+    def get_tasks(self):
+        c = self.conn.cursor()
+        c.execute("SELECT id, title, difficulty, topic FROM tasks ORDER BY id DESC")
+        return c.fetchall()
+
+    def get_task_details(self, task_id):
+        c = self.conn.cursor()
+        c.execute("SELECT * FROM tasks WHERE id=?", (task_id,))
+        return c.fetchone()
+
+    def update_task(self, task_id, title, difficulty, topic, description, attachment, file_format, judge_workers=1):
+        c = self.conn.cursor()
+        if attachment and file_format:
+             c.execute("""UPDATE tasks SET title=?, difficulty=?, topic=?, description=?, attachment=?, file_format=?, judge_workers=? 
+                         WHERE id=?""",
+                       (title, difficulty, topic, description, attachment, file_format, judge_workers, task_id))
+        else:
+            c.execute("""UPDATE tasks SET title=?, difficulty=?, topic=?, description=?, judge_workers=?
+                         WHERE id=?""",
+                       (title, difficulty, topic, description, judge_workers, task_id))
+        self.conn.commit()
+
+
+    def delete_task(self, task_id):
+        c = self.conn.cursor()
+        c.execute("DELETE FROM tests WHERE task_id=?", (task_id,))
+        c.execute("DELETE FROM verdict_cache WHERE task_id=?", (task_id,))
+        c.execute("DELETE FROM tasks WHERE id=?", (task_id,))
+        self.conn.commit()
+
+    def _bump_tests_version(self, c, task_id):
+        """Набор тестов задачи изменился: новая версия делает старые кэшированные вердикты недействительными."""
+        c.execute("UPDATE tasks SET tests_version = COALESCE(tests_version, 0) + 1 WHERE id=?", (task_id,))
+        c.execute("DELETE FROM verdict_cache WHERE task_id=?", (task_id,))
+
+    def get_judge_workers(self, task_id):
+        c = self.conn.cursor()
+        c.execute("SELECT judge_workers FROM tasks WHERE id=?", (task_id,))
+        row = c.fetchone()
+        return (row['judge_workers'] or 1) if row else 1
+
+    def get_tests_version(self, task_id):
+        c = self.conn.cursor()
+        c.execute("SELECT tests_version FROM tasks WHERE id=?", (task_id,))
+        row = c.fetchone()
+        return (row['tests_version'] or 0) if row else 0
+
+    def add_test(self, task_id, test_input, expected_output, time_limit, memory_limit=None):
+        c = self.conn.cursor()
+        c.execute("INSERT INTO tests (task_id, test_input, expected_output, time_limit, memory_limit) VALUES (?,?,?,?,?)",
+                  (task_id, test_input, expected_output, time_limit, memory_limit))
+        self._bump_tests_version(c, task_id)
+        self.conn.commit()
+
+    def get_tests_for_task(self, task_id):
+        c = self.conn.cursor()
+        c.execute("SELECT id, test_input, expected_output, time_limit, memory_limit FROM tests WHERE task_id=?", (task_id,))
+        return c.fetchall()
+
+    def get_test_data(self, task_id):
+        """Тесты задачи в виде, в котором их получает судья (переводы строк нормализованы)."""
+        return [
+            {
+                'input': t['test_input'].replace('\r\n', '\n') if t['test_input'] else '',
+                'output': t['expected_output'].replace('\r\n', '\n') if t['expected_output'] else '',
+                'limit': t['time_limit'],
+                'memory_limit': t['memory_limit']
+            } for t in self.get_tests_for_task(task_id)
+        ]
+
+    def get_test_set(self, task_id, tests_version=None):
+        """
+        Набор тестов задачи в хранилище тестов. Тесты читаются из БД и записываются
+        на диск только при первом обращении к новой версии набора.
+        """
+        if tests_version is None:
+            tests_version = self.get_tests_version(task_id)
+        prefix = f"task{task_id}-v"
+        key = f"{prefix}{tests_version}"
+        store = _get_test_store()
+        return store.get(key, lambda: self.get_test_data(task_id), replaces=prefix)
+
+    def get_test_details(self, test_id):
+        c = self.conn.cursor()
+        c.execute("SELECT * FROM tests WHERE id=?", (test_id,))
+        return c.fetchone()
+
+    def update_test(self, test_id, test_input, expected_output, time_limit, memory_limit=None):
+        c = self.conn.cursor()
+        c.execute("""UPDATE tests SET test_input=?, expected_output=?, time_limit=?, memory_limit=? 
+                       WHERE id=?""", (test_input, expected_output, time_limit, memory_limit, test_id))
+        row = c.execute("SELECT task_id FROM tests WHERE id=?", (test_id,)).fetchone()
+        if row:
+            self._bump_tests_version(c, row['task_id'])
+        self.conn.commit()
+
+    def delete_test(self, test_id):
+        c = self.conn.cursor()
+        row = c.execute("SELECT task_id FROM tests WHERE id=?", (test_id,)).fetchone()
+        c.execute("DELETE FROM tests WHERE id=?", (test_id,))
+        if row:
+            self._bump_tests_version(c, row['task_id'])
+        self.conn.commit()
+
+    def get_cached_verdict(self, cache_key):
+        c = self.conn.cursor()
+        c.execute("SELECT verdicts, global_err FROM verdict_cache WHERE cache_key=?", (cache_key,))
+        row = c.fetchone()
+        if not row:
+            return None
+        verdicts = json.loads(row['verdicts']) if row['verdicts'] else None
+        return (verdicts, row['global_err'])
+
+    def save_cached_verdict(self, cache_key, task_id, verdicts, global_err):
+        c = self.conn.cursor()
+        c.execute("""
+            INSERT OR REPLACE INTO verdict_cache (cache_key, task_id, verdicts, global_err)
+            VALUES (?, ?, ?, ?)
+        """, (cache_key, task_id, json.dumps(verdicts), global_err))
+        # Держим таблицу ограниченной: удаляем самые старые записи
+        c.execute("DELETE FROM verdict_cache WHERE id <= (SELECT MAX(id) FROM verdict_cache) - ?",
+                  (self.VERDICT_CACHE_MAX_ROWS,))
+        self.conn.commit()
+    
+    def add_submission(self, task_id, language, code, result):
+        c = self.conn.cursor()
+        c.execute("INSERT INTO submissions (task_id, language, code, result) VALUES (?,?,?,?)",
+                  (task_id, language, code, result))
+        self.conn.commit()
+    # --- ДОБАВИТЬ ЭТОТ МЕТОД В КЛАСС DBManager ---
+    def get_participant_progress(self, olympiad_id, participant_uuid):
+        """Восстанавливает прогресс участника из базы данных, если он есть."""
+        c = self.conn.cursor()
+        
+        # 1. Достаем баллы и статус
+        c.execute("""
+            SELECT task_scores, disqualified, organization 
+            FROM olympiad_results 
+            WHERE olympiad_id = ? AND participant_uuid = ?
+        """, (olympiad_id, participant_uuid))
+        row_res = c.fetchone()
+        
+        if not row_res:
+            return None # Участника нет в базе
+            
+        # 2. Достаем сохраненный код (последние посылки)
+        c.execute("""
+            SELECT task_submissions 
+            FROM olympiad_submissions 
+            WHERE olympiad_id = ? AND participant_uuid = ?
+        """, (olympiad_id, participant_uuid))
+        row_sub = c.fetchone()
+        
+        scores = json.loads(row_res['task_scores'])
+        
+        # Если посылок нет (редкий случай), создаем пустой словарь
+        last_submissions = {}
+        if row_sub and row_sub['task_submissions']:
+            last_submissions = json.loads(row_sub['task_submissions'])
+            
+        return {
+            'scores': scores,
+            'disqualified': row_res['disqualified'],
+            'organization': row_res['organization'],
+            'last_submissions': last_submissions
+        }
+
+def set_python_executor(mode):
+    """Выбирает способ запуска тестов Python (см. PYTHON_EXECUTORS)."""
+    global _python_executor
+    if mode not in PYTHON_EXECUTORS:
+        print(f"WARNING: Неизвестный PYTHON_EXECUTOR '{mode}', используется 'spawn'.")
+        mode = "spawn"
+    _python_executor = mode
+
+def init_test_store(root_dir):
+    """Создает хранилище тестов и в фоне удаляет из него файлы, на которые никто не ссылается."""
+    global _test_store
+    _test_store = TestStore(root_dir)
+    threading.Thread(target=_test_store.collect_garbage, daemon=True).start()
+    return _test_store
+
+def _get_test_store():
+    if _test_store is None:
+        init_test_store(TEST_STORE_DIR)
+    return _test_store
+
+def _test_store_volume():
+    return f"{_get_docker_path(_get_test_store().root_dir)}:{TEST_STORE_MOUNT}:ro"
+
+def init_scratch(root_dir=None, max_mb=SCRATCH_MAX_MB):
+    """Пул рабочих папок посылок в root_dir (пусто - /dev/shm, если есть) и фоновый сборщик брошенных папок."""
+    global _scratch
+    _scratch = ScratchPool(root_dir or default_scratch_root(), max_mb * 1024 * 1024)
+    _scratch.start_reaper()
+    return _scratch
+
+def _get_scratch():
+    if _scratch is None:
+        init_scratch()
+    return _scratch
+
+def set_container_tmpfs(size_mb):
+    """Размер tmpfs, монтируемого в /tmp контейнеров судьи (вызывать до init_container_pools)."""
+    global CONTAINER_TMPFS_MB
+    CONTAINER_TMPFS_MB = size_mb
+
+def _docker_run_args():
+    return DOCKER_COMMON_ARGS + ["--tmpfs", f"/tmp:rw,exec,nosuid,mode=1777,size={CONTAINER_TMPFS_MB}m"]
+
+def init_container_pools(pool_size, max_uses):
+    """
+    Создает пулы заранее запущенных контейнеров для каждого образа судьи
+    и прогревает их в фоне. pool_size обычно равен MAX_CHECKS.
+    """
+    for image in (DOCKER_IMAGE_PYTHON, DOCKER_IMAGE_CPP):
+        if image in _container_pools:
+            continue
+        pool = ContainerPool(image, pool_size, max_uses, _docker_run_args(), _get_docker_path, DOCKER_RUN_DIR,
+                             extra_volumes=[_test_store_volume()], scratch_root=_get_scratch().root_dir)
+        _container_pools[image] = pool
+        threading.Thread(target=pool.warm_up, daemon=True).start()
+
+def shutdown_container_pools():
+    for pool in _container_pools.values():
+        pool.shutdown()
+
+def init_compile_cache(cache_dir, max_mb):
+    """Включает кэш скомпилированных C++ программ (LRU, не больше max_mb мегабайт)."""
+    global _compile_cache
+    _compile_cache = CompileCache(cache_dir, max_mb * 1024 * 1024)
+
+def _get_image_id(docker_image):
+    """ID образа Docker (запоминается после первого запроса). None, если узнать не удалось."""
+    if docker_image in _image_ids:
+        return _image_ids[docker_image]
+    try:
+        result = docker_backend.run(
+            ["docker", "image", "inspect", "--format", "{{.Id}}", docker_image],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=30
+        )
+    except Exception as e:
+        print(f"WARNING: Не удалось получить ID образа {docker_image}: {e}")
+        return None
+    if result.returncode != 0:
+        return None
+    image_id = result.stdout.decode('utf-8', errors='replace').strip()
+    _image_ids[docker_image] = image_id
+    return image_id
+
+def _compile_cache_key(code, language, docker_image):
+    if _compile_cache is None or language != "C++":
+        return None
+    image_id = _get_image_id(docker_image)
+    if not image_id:
+        return None
+    return CompileCache.make_key(code, CPP_COMPILE_FLAGS, image_id)
+
+def _compilation_error(error_msg):
+    """Текст глобальной ошибки компиляции: по префиксу приложение отличает CE от остальных ошибок."""
+    return f"{COMPILATION_ERROR_PREFIX} {error_msg}"
+
+# --- "Пакетная" функция ---
+def _run_batch(code, test_set, language, judge_script, docker_image, stop_on_fail=False, workers=1, on_verdict=None):
+    """
+    Выполняет "пакетную" проверку кода (1 запуск Docker на все тесты).
+    test_set - TestSet из хранилища тестов (или список тестов, который будет
+    записан в хранилище); судья читает тесты из хранилища, смонтированного только для чтения,
+    поэтому для посылки на диск пишется лишь исходный код.
+    stop_on_fail=True - судья останавливается на первом не-Accepted тесте
+    (список вердиктов тогда заканчивается на этом тесте).
+    workers > 1 - независимые тесты запускаются параллельно (не больше JUDGE_MAX_WORKERS),
+    лимит времени при этом проверяется по процессорному времени каждого теста.
+    on_verdict(verdict) вызывается для каждого теста сразу после его завершения;
+    если он вернет False, проверка прерывается (global_error_string тогда не пустой).
+    Если для образа есть пул, посылка выполняется в уже запущенном контейнере (docker exec),
+    иначе запускается одноразовый контейнер, как раньше.
+    Для C++ сначала проверяется кэш компиляции: повторная посылка того же кода
+    не компилируется заново.
+    Возвращает (list_of_verdicts, global_error_string)
+    """
+    cache_key = _compile_cache_key(code, language, docker_image)
+    cached_binary = None
+    if cache_key:
+        cached = _compile_cache.get(cache_key)
+        if cached and cached[0] == 'error':
+            return None, _compilation_error(cached[1])
+        if cached:
+            cached_binary = cached[1]
+
+    store = _get_test_store()
+    if isinstance(test_set, list):
+        test_set = store.get_for_list(test_set)
+    judge_path = store.put_script(judge_script)
+
+    tmp_dir = None
+    pool = _container_pools.get(docker_image)
+    container = pool.acquire() if pool else None
+    try:
+        if container:
+            work_dir = container.host_dir
+        else:
+            tmp_dir = _get_scratch().acquire(len(code.encode('utf-8')) + len(cached_binary or b""))
+            work_dir = tmp_dir
+        
+        code_filename = "script.py" if language == "Python" else "source.cpp"
+
+        with open(os.path.join(work_dir, code_filename), "w", encoding="utf-8") as f:
+            f.write(code)
+        if cached_binary is not None:
+            with open(os.path.join(work_dir, "a.out"), "wb") as f:
+                f.write(cached_binary)
+        
+        workers = max(1, min(int(workers or 1), JUDGE_MAX_WORKERS))
+        # Параллельные тесты делят процессор, поэтому общий лимит не уменьшаем
+        total_time_limit = sum(float(limit) for limit in test_set.limits)
+        docker_total_timeout = total_time_limit + 15.0
+        
+        judge_env = {
+            "JUDGE_STOP_ON_FAIL": "1" if stop_on_fail else "0",
+            "JUDGE_WORKERS": str(workers),
+            "JUDGE_TESTS_ROOT": TEST_STORE_MOUNT,
+            "JUDGE_TEST_SET": test_set.key,
+            "JUDGE_DEFAULT_MEMORY_MB": str(DEFAULT_MEMORY_LIMIT_MB),
+            "JUDGE_OUTPUT_LIMIT_KB": str(OUTPUT_LIMIT_KB),
+            "JUDGE_PREVIEW_BYTES": str(OUTPUT_PREVIEW_BYTES)
+        }
+        if language == "Python" and _python_executor == "zygote":
+            judge_env["JUDGE_ZYGOTE"] = f"{TEST_STORE_MOUNT}/{store.put_script(ZYGOTE_SCRIPT_PYTHON)}"
+        
+        container_command = ["python3", f"{TEST_STORE_MOUNT}/{judge_path}"]
+        if container:
+            command = container.exec_command(container_command, judge_env)
+        else:
+            abs_path = os.path.abspath(tmp_dir)
+            docker_path = _get_docker_path(abs_path)
+            docker_volume_arg = ["-v", f"{docker_path}:{DOCKER_RUN_DIR}:ro", "-v", _test_store_volume()]
+            docker_env_args = [arg for k, v in judge_env.items() for arg in ("-e", f"{k}={v}")]
+            command = _docker_run_args() + docker_volume_arg + docker_env_args + [docker_image] + container_command
+
+        verdicts = []
+        error_msg = None
+        finished = False
+        aborted = False
+        timed_out = threading.Event()
+
+        with tempfile.TemporaryFile() as err_file:
+            process = docker_backend.popen(command, err_file)
+
+            def kill_on_timeout():
+                timed_out.set()
+                process.kill()
+
+            timer = threading.Timer(docker_total_timeout, kill_on_timeout)
+            timer.start()
+            try:
+                # Судья пишет по одному JSON-объекту на строку, читаем их по мере появления
+                for raw_line in process.stdout:
+                    line = raw_line.decode('utf-8', errors='replace').strip()
+                    if not line:
+                        continue
+                    try:
+                        message = json.loads(line)
+                    except json.JSONDecodeError:
+                        error_msg = f"JSON Decode Error. Raw output: {line}"
+                        continue
+
+                    if "compiled" in message:
+                        # Скомпилированный бинарник (для кэша компиляции)
+                        if cache_key:
+                            try:
+                                _compile_cache.put_binary(cache_key, base64.b64decode(message["compiled"]))
+                            except ValueError as e:
+                                print(f"WARNING: Не удалось разобрать бинарник для кэша компиляции: {e}")
+                    elif message.get("done"):
+                        finished = True
+                    elif message.get("verdict") == "Compilation Error":
+                        compile_error = message.get("error", "")
+                        if cache_key and message.get("cacheable", True):
+                            _compile_cache.put_error(cache_key, compile_error)
+                        return None, _compilation_error(compile_error)
+                    else:
+                        verdicts.append(message)
+                        if on_verdict and on_verdict(message) is False:
+                            # Вызывающий код сообщил, что результат больше не нужен
+                            aborted = True
+                            process.kill()
+                            break
+            finally:
+                timer.cancel()
+                try:
+                    process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                    process.wait()
+                process.stdout.close()
+
+            err_file.seek(0)
+            err = err_file.read().decode('utf-8', errors='replace')
+
+        if aborted or timed_out.is_set():
+            if container:
+                # Внутри могли остаться зависшие процессы - такой контейнер не переиспользуем
+                container.broken = True
+            if aborted:
+                return verdicts, "Проверка прервана сервером"
+            return None, "Time Limit Exceeded (Overall Timeout)"
+
+        if err:
+             if container:
+                 container.broken = True
+             return None, f"Docker/Judge Error: {err}"
+
+        if error_msg:
+            return None, error_msg
+        if not finished:
+            return None, "Judge Error: судья завершился, не выдав все результаты"
+        return verdicts, None
+
+    except subprocess.TimeoutExpired:
+        if container:
+            # Внутри могли остаться зависшие процессы - такой контейнер не переиспользуем
+            container.broken = True
+        return None, "Time Limit Exceeded (Overall Timeout)"
+    except Exception as e:
+        if container:
+            container.broken = True
+        return None, f"Docker execution error: {str(e)}"
+    finally:
+        if container:
+            pool.release(container)
+        if tmp_dir:
+            # Папка очищается и возвращается в пул; что не удалось удалить, удалит фоновый сборщик
+            _get_scratch().release(tmp_dir)
+
+# --- Новая функция-обертка для Python ---
+def run_python(code, test_set, stop_on_fail=False, workers=1, on_verdict=None):
+    """
+    Принимает код и набор тестов (TestSet из db.get_test_set или СПИСОК тестов).
+    Возвращает (list_of_verdicts, global_error_string)
+    """
+    return _run_batch(code, test_set, "Python", JUDGE_SCRIPT_PYTHON, DOCKER_IMAGE_PYTHON, stop_on_fail, workers, on_verdict)
+
+# --- Новая функция-обертка для C++ ---
+def run_cpp(code, test_set, stop_on_fail=False, workers=1, on_verdict=None):
+    """
+    Принимает код и набор тестов (TestSet из db.get_test_set или СПИСОК тестов).
+    Возвращает (list_of_verdicts, global_error_string)
+    """
+    return _run_batch(code, test_set, "C++", JUDGE_SCRIPT_CPP, DOCKER_IMAGE_CPP, stop_on_fail, workers, on_verdict)
\ No newline at end of file
@@ -0,0 +1,340 @@
+import json
+import socket
+import struct
+import subprocess
+import threading
+import time
+import http.client
+from urllib.parse import quote, urlencode
+
+# Как сервер управляет Docker: "cli" - запуск программы docker на каждую операцию,
+# "api" - запросы к Docker Engine API через Unix-сокет по постоянному соединению.
+# Остальной код формирует команды docker (DOCKER_COMMON_ARGS и т.д.) и вызывает
+# run()/popen() из этого модуля: в режиме "api" команда переводится в запросы к API.
+DOCKER_BACKENDS = ("cli", "api")
+DOCKER_SOCKET = "/var/run/docker.sock"
+API_VERSION = "v1.41"
+
+_engine = None
+
+
+def set_docker_backend(mode, socket_path=DOCKER_SOCKET):
+    global _engine
+    if mode not in DOCKER_BACKENDS:
+        print(f"WARNING: Неизвестный DOCKER_BACKEND '{mode}', используется 'cli'.")
+        mode = "cli"
+    _engine = DockerEngine(socket_path) if mode == "api" else None
+
+
+def run(command, stdout=None, stderr=None, timeout=None):
+    """Как subprocess.run для команды docker (возвращает CompletedProcess)."""
+    if _engine is None:
+        return subprocess.run(command, stdout=stdout, stderr=stderr, timeout=timeout)
+    return _engine.run(command, timeout)
+
+
+def popen(command, stderr_file):
+    """
+    Как subprocess.Popen(command, stdout=PIPE, stderr=stderr_file) для docker run/exec:
+    у результата есть stdout (итерация по строкам), kill(), wait(timeout) и returncode.
+    """
+    if _engine is None:
+        return subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr_file)
+    return _engine.popen(command, stderr_file)
+
+
+class EngineError(Exception):
+    pass
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def _parse_size(value):
+    units = {"b": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+    value = value.strip().lower()
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def _split_options(args, with_value):
+    """Разбирает опции команды docker до первого позиционного аргумента: ([(флаг, значение)], остаток)."""
+    options = []
+    i = 0
+    while i < len(args) and args[i].startswith("-"):
+        flag, eq, value = args[i].partition("=")
+        if not eq and flag in with_value:
+            value = args[i + 1]
+            i += 1
+        options.append((flag, value if (eq or flag in with_value) else None))
+        i += 1
+    return options, args[i:]
+
+
+class DockerEngine:
+    """
+    Клиент Docker Engine API. Короткие запросы (create, start, wait, remove...) идут
+    по постоянному соединению (одному на поток); потоки вывода контейнера читаются
+    по отдельному соединению, так как Docker занимает его до конца вывода.
+    """
+
+    RUN_OPTIONS_WITH_VALUE = {"-v", "-w", "-e", "--name", "--tmpfs", "--label", "--user", "--memory", "--cpus",
+                              "--pids-limit", "--network"}
+
+    def __init__(self, socket_path=DOCKER_SOCKET):
+        self.socket_path = socket_path
+        self.local = threading.local()
+
+    # --- HTTP ---
+
+    def _connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = _UnixHTTPConnection(self.socket_path)
+            self.local.conn = conn
+        return conn
+
+    def request(self, method, path, body=None, timeout=None):
+        """Запрос по постоянному соединению потока. Возвращает (статус, разобранный JSON или None)."""
+        payload = json.dumps(body).encode("utf-8") if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                if conn.sock is None:
+                    conn.connect()
+                conn.sock.settimeout(timeout)
+                conn.request(method, f"/{API_VERSION}{path}", body=payload, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+                if response.will_close:
+                    conn.close()
+                break
+            except socket.timeout:
+                # Ответ еще может прийти - такое соединение больше не годится
+                conn.close()
+                raise
+            except (ConnectionError, http.client.HTTPException, BrokenPipeError):
+                # Docker закрыл простаивавшее соединение - переподключаемся один раз
+                conn.close()
+                if attempt:
+                    raise
+        try:
+            parsed = json.loads(data) if data else None
+        except ValueError:
+            parsed = data.decode("utf-8", errors="replace")
+        if response.status >= 400:
+            message = parsed.get("message") if isinstance(parsed, dict) else parsed
+            raise EngineError(f"{method} {path}: {response.status} {message}")
+        return response.status, parsed
+
+    def open_stream(self, method, path, body=None):
+        """Запрос, ответ на который - поток вывода; использует отдельное соединение."""
+        conn = _UnixHTTPConnection(self.socket_path)
+        payload = json.dumps(body).encode("utf-8") if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        conn.request(method, f"/{API_VERSION}{path}", body=payload, headers=headers)
+        response = conn.getresponse()
+        if response.status >= 400:
+            message = response.read().decode("utf-8", errors="replace")
+            conn.close()
+            raise EngineError(f"{method} {path}: {response.status} {message}")
+        return conn, response
+
+    # --- Перевод команд docker в запросы ---
+
+    def run(self, command, timeout=None):
+        args = command[1:]
+        try:
+            if args[:1] == ["run"]:
+                options, rest = _split_options(args[1:], self.RUN_OPTIONS_WITH_VALUE)
+                if ("-d", None) not in options:
+                    raise EngineError("поддерживается только docker run -d")
+                container_id = self._create(options, rest, timeout)
+                self.request("POST", f"/containers/{container_id}/start", timeout=timeout)
+                return subprocess.CompletedProcess(command, 0, (container_id + "\n").encode("utf-8"), b"")
+            if args[:1] == ["exec"]:
+                process = self.popen(command, None)
+                output = b"".join(process.stdout)
+                process.stdout.close()
+                return subprocess.CompletedProcess(command, process.wait(timeout), output, b"")
+            if args[:2] == ["rm", "-f"]:
+                for name in args[2:]:
+                    self.request("DELETE", f"/containers/{quote(name)}?force=1", timeout=timeout)
+                return subprocess.CompletedProcess(command, 0, b"", b"")
+            if args[:2] == ["image", "inspect"]:
+                _, info = self.request("GET", f"/images/{quote(args[-1])}/json", timeout=timeout)
+                return subprocess.CompletedProcess(command, 0, (info["Id"] + "\n").encode("utf-8"), b"")
+        except (EngineError, OSError, http.client.HTTPException) as e:
+            return subprocess.CompletedProcess(command, 1, b"", str(e).encode("utf-8"))
+        raise EngineError(f"Команда не поддерживается Docker Engine API: {' '.join(command[:3])}")
+
+    def popen(self, command, stderr_file):
+        args = command[1:]
+        if args[:1] == ["run"]:
+            options, rest = _split_options(args[1:], self.RUN_OPTIONS_WITH_VALUE)
+            container_id = self._create(options, rest, None, auto_remove=False)
+            self.request("POST", f"/containers/{container_id}/start")
+            return _ContainerProcess(self, container_id, stderr_file)
+        if args[:1] == ["exec"]:
+            options, rest = _split_options(args[1:], {"-e", "-u", "--user", "-w"})
+            body = {
+                "AttachStdout": True,
+                "AttachStderr": True,
+                "Env": [value for flag, value in options if flag == "-e"],
+                "Cmd": rest[1:]
+            }
+            _, created = self.request("POST", f"/containers/{quote(rest[0])}/exec", body)
+            return _ExecProcess(self, created["Id"], stderr_file)
+        raise EngineError(f"Команда не поддерживается Docker Engine API: {' '.join(command[:3])}")
+
+    def _create(self, options, rest, timeout, auto_remove=None):
+        image, cmd = rest[0], rest[1:]
+        host_config = {"Binds": [], "Tmpfs": {}}
+        body = {"Image": image, "Cmd": cmd, "Env": [], "Labels": {}, "HostConfig": host_config}
+        name = None
+        for flag, value in options:
+            if flag == "--rm":
+                host_config["AutoRemove"] = True
+            elif flag == "--network":
+                host_config["NetworkMode"] = value
+            elif flag == "--memory":
+                host_config["Memory"] = _parse_size(value)
+            elif flag == "--cpus":
+                host_config["NanoCpus"] = int(float(value) * 1e9)
+            elif flag == "--pids-limit":
+                host_config["PidsLimit"] = int(value)
+            elif flag == "--user":
+                body["User"] = value
+            elif flag == "-w":
+                body["WorkingDir"] = value
+            elif flag == "-v":
+                host_config["Binds"].append(value)
+            elif flag == "-e":
+                body["Env"].append(value)
+            elif flag == "--tmpfs":
+                path, _, tmpfs_options = value.partition(":")
+                host_config["Tmpfs"][path] = tmpfs_options
+            elif flag == "--label":
+                key, _, label = value.partition("=")
+                body["Labels"][key] = label
+            elif flag == "--name":
+                name = value
+        if auto_remove is not None:
+            host_config["AutoRemove"] = auto_remove
+        query = "?" + urlencode({"name": name}) if name else ""
+        _, created = self.request("POST", f"/containers/create{query}", body, timeout=timeout)
+        return created["Id"]
+
+
+class _MultiplexedStdout:
+    """Разбирает поток Docker (заголовок 8 байт: номер потока и длина) на строки stdout; stderr - в файл."""
+
+    def __init__(self, conn, response, stderr_file):
+        self.conn = conn
+        self.response = response
+        self.stderr_file = stderr_file
+
+    def __iter__(self):
+        buffer = b""
+        try:
+            while True:
+                header = self.response.read(8)
+                if len(header) < 8:
+                    break
+                stream_type, size = struct.unpack(">BxxxL", header)
+                data = self.response.read(size)
+                if stream_type == 2:
+                    if self.stderr_file is not None:
+                        self.stderr_file.write(data)
+                    continue
+                buffer += data
+                while b"\n" in buffer:
+                    line, buffer = buffer.split(b"\n", 1)
+                    yield line + b"\n"
+        except (OSError, ValueError, http.client.HTTPException):
+            pass
+        if buffer:
+            yield buffer
+
+    def close(self):
+        self.conn.close()
+
+
+class _ContainerProcess:
+    """Контейнер docker run, запущенный через API: аналог Popen."""
+
+    def __init__(self, engine, container_id, stderr_file):
+        self.engine = engine
+        self.container_id = container_id
+        self.returncode = None
+        conn, response = engine.open_stream(
+            "GET", f"/containers/{container_id}/logs?follow=1&stdout=1&stderr=1")
+        self.stdout = _MultiplexedStdout(conn, response, stderr_file)
+
+    def kill(self):
+        try:
+            self.engine.request("POST", f"/containers/{self.container_id}/kill", timeout=10)
+        except (EngineError, OSError, http.client.HTTPException):
+            pass
+
+    def wait(self, timeout=None):
+        if self.returncode is not None:
+            return self.returncode
+        try:
+            _, result = self.engine.request("POST", f"/containers/{self.container_id}/wait", timeout=timeout)
+        except socket.timeout:
+            raise subprocess.TimeoutExpired(["docker", "wait", self.container_id], timeout)
+        self.returncode = result.get("StatusCode", 1)
+        try:
+            self.engine.request("DELETE", f"/containers/{self.container_id}?force=1", timeout=30)
+        except (EngineError, OSError, http.client.HTTPException):
+            pass
+        return self.returncode
+
+
+class _ExecProcess:
+    """Процесс docker exec, запущенный через API: аналог Popen."""
+
+    def __init__(self, engine, exec_id, stderr_file):
+        self.engine = engine
+        self.exec_id = exec_id
+        self.returncode = None
+        conn, response = engine.open_stream("POST", f"/exec/{exec_id}/start", {"Detach": False, "Tty": False})
+        self.stdout = _MultiplexedStdout(conn, response, stderr_file)
+
+    def kill(self):
+        # Процесс внутри контейнера API не убить; как и с docker exec, просто отключаемся,
+        # а вызывающий код помечает контейнер сломанным
+        try:
+            self.stdout.conn.sock.shutdown(socket.SHUT_RDWR)
+        except (OSError, AttributeError):
+            pass
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.returncode is None:
+            try:
+                _, info = self.engine.request("GET", f"/exec/{self.exec_id}/json", timeout=10)
+            except (EngineError, OSError, http.client.HTTPException):
+                self.returncode = -1
+                break
+            if not info.get("Running"):
+                self.returncode = info.get("ExitCode")
+                if self.returncode is None:
+                    self.returncode = -1
+                break
+            if deadline is not None and time.monotonic() > deadline:
+                raise subprocess.TimeoutExpired(["docker", "exec", self.exec_id], timeout)
+            time.sleep(0.05)
+        return self.returncode
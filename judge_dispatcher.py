@@ -0,0 +1,252 @@
+import os
+import json
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+
+# Протокол между веб-сервером и удаленными судьями (judge_worker.py):
+# по одному JSON-объекту на строку в обе стороны.
+#   судья -> сервер: register {name, slots, token}, ready {} (один на свободный слот),
+#                    verdict {job_id, verdict}, result {job_id, verdicts, global_err}, ping {}
+#   сервер -> судья: registered {worker_id}, job {job_id, language, code, test_set, stop_on_fail, workers},
+#                    cancel {job_id}, pong {}, error {message}
+# Тесты набора передаются судье только один раз за соединение.
+
+# Судья шлет ping раз в PING_INTERVAL секунд; если от него ничего нет
+# HEARTBEAT_TIMEOUT секунд, он считается потерянным
+PING_INTERVAL = 10.0
+HEARTBEAT_TIMEOUT = 30.0
+
+
+def parse_address(address):
+    """'unix:/path/to.sock' или 'host:port' -> (семейство сокета, адрес)."""
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def send_message(sock, send_lock, message):
+    data = (json.dumps(message) + "\n").encode('utf-8')
+    with send_lock:
+        sock.sendall(data)
+
+
+class RemoteJob:
+    def __init__(self, message, test_key, on_verdict):
+        self.job_id = message['job_id']
+        self.message = message
+        self.test_key = test_key
+        self.on_verdict = on_verdict
+        self.seen_tests = set()  # Тесты, о которых уже сообщили (после перезапуска на другом судье не повторяем)
+        self.cancelled = False
+        self.worker = None
+        self.result = None
+        self.event = threading.Event()
+
+
+class RemoteWorker:
+    def __init__(self, name, slots, sock):
+        self.worker_id = uuid.uuid4().hex[:8]
+        self.name = name
+        self.slots = slots
+        self.sock = sock
+        self.send_lock = threading.Lock()
+        self.ready = 0  # Сколько свободных слотов судья запросил и еще не получил работу
+        self.jobs = {}  # job_id -> RemoteJob
+        self.known_sets = set()  # Наборы тестов, уже переданные этому судье
+
+    def send(self, message):
+        send_message(self.sock, self.send_lock, message)
+
+
+class JudgeDispatcher:
+    """
+    Раздает посылки удаленным судьям (judge_worker.py), подключенным по TCP или Unix-сокету.
+    Судьи сами забирают работу: на каждый свободный слот присылают ready.
+    Если судья отключился или перестал отвечать, его незавершенные посылки
+    возвращаются в начало очереди и достаются другим судьям.
+    """
+
+    def __init__(self, address, token, test_store, on_capacity_change=None):
+        self.address = address
+        self.token = token
+        self.test_store = test_store
+        self.on_capacity_change = on_capacity_change
+        self.lock = threading.Lock()
+        self.workers = {}  # worker_id -> RemoteWorker
+        self.pending = deque()  # RemoteJob, ждущие свободного судьи
+
+    def start(self):
+        family, address = parse_address(self.address)
+        server = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_UNIX:
+            if os.path.exists(address):
+                os.remove(address)
+        else:
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(address)
+        server.listen()
+        self.server = server
+        threading.Thread(target=self._accept_loop, name="judge-dispatcher", daemon=True).start()
+        print(f"INFO: Ожидаем подключения удаленных судей на {self.address}")
+
+    def capacity(self):
+        """Сколько слотов проверки у всех подключенных судей."""
+        with self.lock:
+            return sum(worker.slots for worker in self.workers.values())
+
+    def stats(self):
+        with self.lock:
+            return {
+                'workers': [{'worker_id': w.worker_id, 'name': w.name, 'slots': w.slots,
+                             'running': len(w.jobs), 'ready': w.ready} for w in self.workers.values()],
+                'pending': len(self.pending)
+            }
+
+    def run(self, language, code, test_set, stop_on_fail=False, workers=1, on_verdict=None):
+        """
+        Проверяет посылку на удаленном судье. Возвращает (verdicts, global_err), как run_python/run_cpp,
+        или None, если свободных удаленных слотов нет - тогда посылку нужно проверить локально.
+        """
+        if isinstance(test_set, list):
+            test_set = self.test_store.get_for_list(test_set)
+        message = {
+            'type': 'job',
+            'job_id': uuid.uuid4().hex,
+            'language': language,
+            'code': code,
+            'test_set': {'key': test_set.key},
+            'stop_on_fail': stop_on_fail,
+            'workers': workers
+        }
+        job = RemoteJob(message, test_set.key, on_verdict)
+        with self.lock:
+            free = sum(w.ready for w in self.workers.values()) - len(self.pending)
+            if free <= 0:
+                return None
+            self.pending.append(job)
+        self._assign()
+
+        while not job.event.wait(1.0):
+            with self.lock:
+                # Все судьи отключились, пока посылка ждала - проверяем ее локально
+                if not self.workers and job in self.pending:
+                    self.pending.remove(job)
+                    return None
+        return job.result
+
+    def _assign(self):
+        sends = []
+        with self.lock:
+            while self.pending:
+                candidates = [w for w in self.workers.values() if w.ready > 0]
+                if not candidates:
+                    break
+                worker = max(candidates, key=lambda w: w.ready)
+                job = self.pending.popleft()
+                worker.ready -= 1
+                worker.jobs[job.job_id] = job
+                job.worker = worker
+
+                message = dict(job.message)
+                message['test_set'] = {'key': job.test_key}
+                if job.test_key not in worker.known_sets:
+                    worker.known_sets.add(job.test_key)
+                    message['test_set']['tests'] = None  # Заполняется вне блокировки
+                sends.append((worker, job, message))
+
+        for worker, job, message in sends:
+            try:
+                if 'tests' in message['test_set']:
+                    message['test_set']['tests'] = self.test_store.load(job.test_key)
+                worker.send(message)
+            except OSError as e:
+                print(f"WARNING: Не удалось отправить посылку судье {worker.name}: {e}")
+                self._drop_worker(worker)
+
+    def _accept_loop(self):
+        while True:
+            try:
+                sock, _ = self.server.accept()
+            except OSError as e:
+                print(f"ERROR: Диспетчер судей остановлен: {e}")
+                return
+            threading.Thread(target=self._serve_worker, args=(sock,), daemon=True).start()
+
+    def _serve_worker(self, sock):
+        sock.settimeout(HEARTBEAT_TIMEOUT)
+        reader = sock.makefile("r", encoding="utf-8")
+        worker = None
+        try:
+            hello = json.loads(reader.readline() or "{}")
+            if hello.get('type') != 'register' or hello.get('token') != self.token:
+                send_message(sock, threading.Lock(), {'type': 'error', 'message': 'Неверный токен или протокол'})
+                return
+
+            worker = RemoteWorker(str(hello.get('name', '?')), max(1, int(hello.get('slots', 1))), sock)
+            worker.send({'type': 'registered', 'worker_id': worker.worker_id})
+            with self.lock:
+                self.workers[worker.worker_id] = worker
+            print(f"INFO: Подключен судья {worker.name} ({worker.slots} слотов)")
+            self._capacity_changed()
+
+            for line in reader:
+                if line.strip():
+                    self._handle(worker, json.loads(line))
+        except (OSError, ValueError) as e:
+            if worker:
+                print(f"WARNING: Связь с судьей {worker.name} потеряна: {e}")
+        finally:
+            if worker:
+                self._drop_worker(worker)
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def _handle(self, worker, message):
+        kind = message.get('type')
+        if kind == 'ping':
+            worker.send({'type': 'pong'})
+        elif kind == 'ready':
+            with self.lock:
+                worker.ready = min(worker.ready + 1, worker.slots)
+            self._assign()
+        elif kind == 'verdict':
+            job = worker.jobs.get(message.get('job_id'))
+            verdict = message.get('verdict') or {}
+            if not job or not job.on_verdict or job.cancelled:
+                return
+            test_num = verdict.get('test_num')
+            if test_num in job.seen_tests:
+                return
+            job.seen_tests.add(test_num)
+            if job.on_verdict(verdict) is False:
+                job.cancelled = True
+                worker.send({'type': 'cancel', 'job_id': job.job_id})
+        elif kind == 'result':
+            with self.lock:
+                job = worker.jobs.pop(message.get('job_id'), None)
+            if job:
+                job.result = (message.get('verdicts'), message.get('global_err'))
+                job.event.set()
+
+    def _drop_worker(self, worker):
+        with self.lock:
+            if self.workers.pop(worker.worker_id, None) is None:
+                return
+            lost = [job for job in worker.jobs.values() if not job.event.is_set()]
+            worker.jobs.clear()
+            for job in reversed(lost):
+                job.worker = None
+                self.pending.appendleft(job)
+        print(f"WARNING: Судья {worker.name} отключен. Возвращено в очередь посылок: {len(lost)}")
+        self._capacity_changed()
+        self._assign()
+
+    def _capacity_changed(self):
+        if self.on_capacity_change:
+            self.on_capacity_change(self.capacity())
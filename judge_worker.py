@@ -0,0 +1,154 @@
+"""
+Удаленный судья: подключается к веб-серверу (JUDGE_LISTEN в config.ini),
+забирает посылки и проверяет их в Docker на своей машине так же, как сервер.
+На одной машине можно запустить несколько судей (например, для проверки):
+
+    python judge_worker.py --server 127.0.0.1:5055 --slots 4 --name box1
+    python judge_worker.py --server unix:/tmp/synaq-judge.sock --slots 2
+"""
+import os
+import json
+import socket
+import argparse
+import threading
+import configparser
+import time
+
+from db_manager import (run_python, run_cpp, init_container_pools, shutdown_container_pools, init_compile_cache,
+                        init_test_store, set_python_executor, init_scratch, set_container_tmpfs)
+from judge_dispatcher import parse_address, send_message, PING_INTERVAL
+from docker_backend import set_docker_backend
+
+# Через сколько секунд переподключаемся после потери связи с сервером
+RECONNECT_DELAY = 5.0
+
+
+class JudgeWorker:
+    def __init__(self, server_address, token, name, slots, store):
+        self.server_address = server_address
+        self.token = token
+        self.name = name
+        self.slots = slots
+        self.store = store
+        self.cancelled = set()  # job_id посылок, которые сервер просил прервать
+
+    def serve_forever(self):
+        while True:
+            try:
+                self._serve_connection()
+            except (OSError, ValueError) as e:
+                print(f"WARNING: Связь с сервером {self.server_address} потеряна: {e}")
+            time.sleep(RECONNECT_DELAY)
+
+    def _serve_connection(self):
+        family, address = parse_address(self.server_address)
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.connect(address)
+        send_lock = threading.Lock()
+        alive = threading.Event()
+        alive.set()
+
+        def send(message):
+            send_message(sock, send_lock, message)
+
+        def ping_loop():
+            while alive.is_set():
+                time.sleep(PING_INTERVAL)
+                try:
+                    send({'type': 'ping'})
+                except OSError:
+                    return
+
+        try:
+            send({'type': 'register', 'name': self.name, 'slots': self.slots, 'token': self.token})
+            reader = sock.makefile("r", encoding="utf-8")
+            reply = json.loads(reader.readline() or "{}")
+            if reply.get('type') != 'registered':
+                print(f"ERROR: Сервер отклонил подключение: {reply.get('message', reply)}")
+                return
+            print(f"INFO: Судья {self.name} подключен к {self.server_address} ({self.slots} слотов)")
+
+            threading.Thread(target=ping_loop, daemon=True).start()
+            for _ in range(self.slots):
+                send({'type': 'ready'})
+
+            for line in reader:
+                if not line.strip():
+                    continue
+                message = json.loads(line)
+                if message.get('type') == 'job':
+                    threading.Thread(target=self._run_job, args=(message, send), daemon=True).start()
+                elif message.get('type') == 'cancel':
+                    self.cancelled.add(message.get('job_id'))
+        finally:
+            alive.clear()
+            sock.close()
+
+    def _run_job(self, message, send):
+        job_id = message['job_id']
+        runner = run_python if message['language'] == "Python" else run_cpp
+
+        def on_verdict(verdict):
+            try:
+                send({'type': 'verdict', 'job_id': job_id, 'verdict': verdict})
+            except OSError:
+                return False
+            return job_id not in self.cancelled
+
+        try:
+            test_set_info = message['test_set']
+            tests = test_set_info.get('tests')
+            test_set = self.store.get(test_set_info['key'], lambda: tests)
+            verdicts, global_err = runner(message['code'], test_set, stop_on_fail=message.get('stop_on_fail', False),
+                                          workers=message.get('workers', 1), on_verdict=on_verdict)
+        except Exception as e:
+            print(f"ERROR: Судья {self.name}: ошибка при проверке посылки {job_id}: {e}")
+            verdicts, global_err = None, f"Judge Error: {e}"
+        finally:
+            self.cancelled.discard(job_id)
+
+        try:
+            send({'type': 'result', 'job_id': job_id, 'verdicts': verdicts, 'global_err': global_err})
+            send({'type': 'ready'})
+        except OSError:
+            # Сервер вернет посылку в очередь сам, когда заметит обрыв связи
+            pass
+
+
+def main():
+    config = configparser.ConfigParser()
+    config.read('config.ini', encoding='utf-8')
+
+    parser = argparse.ArgumentParser(description="Удаленный судья Тестировщика")
+    parser.add_argument('--server', default=config.get('server', 'JUDGE_LISTEN', fallback='127.0.0.1:5055').strip(),
+                        help="адрес сервера: host:port или unix:/path/to.sock")
+    parser.add_argument('--token', default=config.get('server', 'JUDGE_TOKEN', fallback='').strip())
+    parser.add_argument('--slots', type=int, default=os.cpu_count() or 1, help="сколько посылок проверять одновременно")
+    parser.add_argument('--name', default=f"{socket.gethostname()}-{os.getpid()}")
+    parser.add_argument('--store', default=config.get('server', 'TEST_STORE_DIR', fallback='test_store').strip(),
+                        help="папка хранилища тестов (можно общую для нескольких судей)")
+    args = parser.parse_args()
+
+    set_docker_backend(config.get('server', 'DOCKER_BACKEND', fallback='cli').strip(),
+                       config.get('server', 'DOCKER_SOCKET', fallback='/var/run/docker.sock').strip())
+    store = init_test_store(args.store)
+    set_python_executor(config.get('server', 'PYTHON_EXECUTOR', fallback='spawn').strip())
+    init_scratch(config.get('server', 'SCRATCH_DIR', fallback='').strip(),
+                 config.getint('server', 'SCRATCH_MAX_MB', fallback=256))
+    set_container_tmpfs(config.getint('server', 'CONTAINER_TMPFS_MB', fallback=160))
+    if config.getboolean('server', 'CONTAINER_POOL', fallback=True):
+        init_container_pools(args.slots, config.getint('server', 'CONTAINER_MAX_USES', fallback=50))
+    compile_cache_mb = config.getint('server', 'COMPILE_CACHE_MAX_MB', fallback=512)
+    if compile_cache_mb > 0:
+        init_compile_cache(config.get('server', 'COMPILE_CACHE_DIR', fallback='compile_cache').strip(), compile_cache_mb)
+
+    try:
+        JudgeWorker(args.server, args.token, args.name, max(1, args.slots), store).serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shutdown_container_pools()
+
+
+if __name__ == "__main__":
+    main()
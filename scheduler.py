@@ -0,0 +1,177 @@
+import threading
+import time
+from collections import deque, OrderedDict
+from contextlib import contextmanager
+
+# Классы приоритета: меньше - важнее. Пока есть ожидающие посылки более
+# важного класса, менее важные слот проверки не получают.
+PRIORITY_OLYMPIAD = 0
+PRIORITY_PRACTICE = 1
+PRIORITY_REJUDGE = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_OLYMPIAD: "olympiad",
+    PRIORITY_PRACTICE: "practice",
+    PRIORITY_REJUDGE: "rejudge",
+}
+
+# Сколько последних ожиданий хранится для статистики
+WAIT_HISTORY_SIZE = 500
+
+
+class _Waiter:
+    def __init__(self, priority, group, owner):
+        self.priority = priority
+        self.group = group
+        self.owner = owner
+        self.event = threading.Event()
+        self.enqueued_at = time.monotonic()
+
+
+class _Group:
+    """Группа посылок (олимпиада или практика): очереди по участникам, обходятся по кругу."""
+
+    def __init__(self, weight):
+        self.weight = weight
+        self.credit = weight  # Сколько слотов группа еще может получить в текущем круге
+        self.owners = OrderedDict()  # owner -> deque ожидающих
+
+    def push(self, waiter):
+        self.owners.setdefault(waiter.owner, deque()).append(waiter)
+
+    def pop(self):
+        # Берем первого участника, а его самого переносим в конец круга
+        owner, waiters = next(iter(self.owners.items()))
+        waiter = waiters.popleft()
+        del self.owners[owner]
+        if waiters:
+            self.owners[owner] = waiters
+        return waiter
+
+    def __len__(self):
+        return sum(len(w) for w in self.owners.values())
+
+
+class FairScheduler:
+    """
+    Планировщик слотов проверки вместо простого семафора.
+    - Классы приоритета: живая олимпиада важнее практики (см. PRIORITY_*).
+    - Внутри класса - взвешенный круговой обход групп (олимпиад): группа с весом w
+      получает до w слотов подряд, потом очередь переходит к следующей.
+    - Внутри группы - круговой обход участников, чтобы одна серия посылок
+      не задерживала остальных.
+    """
+
+    def __init__(self, slots):
+        self.slots = slots
+        self.lock = threading.Lock()
+        self.running = 0
+        self.weights = {}  # group -> вес
+        self.classes = {p: OrderedDict() for p in PRIORITY_NAMES}  # priority -> group -> _Group
+        self.running_by_class = {p: 0 for p in PRIORITY_NAMES}
+        self.granted_by_class = {p: 0 for p in PRIORITY_NAMES}
+        self.waits_by_class = {p: deque(maxlen=WAIT_HISTORY_SIZE) for p in PRIORITY_NAMES}
+
+    def set_weight(self, group, weight):
+        """Вес группы во взвешенном круговом обходе (по умолчанию 1)."""
+        with self.lock:
+            self.weights[group] = max(1, int(weight))
+
+    def resize(self, slots):
+        """Меняет число слотов (например, когда подключаются или отключаются удаленные судьи)."""
+        with self.lock:
+            self.slots = max(1, slots)
+            self._dispatch()
+
+    def backlog(self):
+        """Сколько посылок ждут слот."""
+        with self.lock:
+            return sum(len(g) for groups in self.classes.values() for g in groups.values())
+
+    def remove_group(self, group):
+        with self.lock:
+            self.weights.pop(group, None)
+
+    @contextmanager
+    def slot(self, priority, group, owner):
+        """Ждет свободный слот проверки (как with semaphore:) и освобождает его на выходе."""
+        self.acquire(priority, group, owner)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def acquire(self, priority, group, owner):
+        waiter = _Waiter(priority, group, owner)
+        with self.lock:
+            groups = self.classes[priority]
+            if group not in groups:
+                groups[group] = _Group(self.weights.get(group, 1))
+            groups[group].push(waiter)
+            self._dispatch()
+        waiter.event.wait()
+
+    def release(self, priority):
+        with self.lock:
+            self.running -= 1
+            self.running_by_class[priority] -= 1
+            self._dispatch()
+
+    def stats(self):
+        """Глубина очередей и время ожидания по классам - для мониторинга."""
+        with self.lock:
+            classes = {}
+            for priority, name in PRIORITY_NAMES.items():
+                waits = list(self.waits_by_class[priority])
+                groups = self.classes[priority]
+                now = time.monotonic()
+                oldest = [w.enqueued_at for g in groups.values() for q in g.owners.values() for w in q]
+                classes[name] = {
+                    'queued': sum(len(g) for g in groups.values()),
+                    'running': self.running_by_class[priority],
+                    'granted_total': self.granted_by_class[priority],
+                    'groups': {str(k): len(g) for k, g in groups.items()},
+                    'wait_avg_sec': round(sum(waits) / len(waits), 3) if waits else 0.0,
+                    'wait_max_sec': round(max(waits), 3) if waits else 0.0,
+                    'oldest_waiting_sec': round(now - min(oldest), 3) if oldest else 0.0,
+                }
+            return {
+                'slots': self.slots,
+                'running': self.running,
+                'queued': sum(c['queued'] for c in classes.values()),
+                'classes': classes,
+            }
+
+    def _dispatch(self):
+        # Вызывается под self.lock: раздает свободные слоты ожидающим
+        while self.running < self.slots:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            self.running += 1
+            self.running_by_class[waiter.priority] += 1
+            self.granted_by_class[waiter.priority] += 1
+            self.waits_by_class[waiter.priority].append(time.monotonic() - waiter.enqueued_at)
+            waiter.event.set()
+
+    def _next_waiter(self):
+        for priority in sorted(self.classes):
+            groups = self.classes[priority]
+            if not groups:
+                continue
+
+            group_id, group = next(iter(groups.items()))
+            waiter = group.pop()
+            group.credit -= 1
+
+            # Группа исчерпала свой вес или очередь - переходит в конец круга
+            del groups[group_id]
+            if len(group):
+                if group.credit > 0:
+                    groups[group_id] = group
+                    groups.move_to_end(group_id, last=False)
+                else:
+                    group.credit = group.weight
+                    groups[group_id] = group
+            return waiter
+        return None
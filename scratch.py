@@ -0,0 +1,128 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+# Папки посылок называются <префикс><pid>-<номер>: по pid сборщик узнает папки упавших процессов
+DIR_PREFIX = "synaq-scratch-"
+# Как часто сборщик ищет брошенные папки (секунды)
+REAPER_INTERVAL = 300
+
+
+def default_scratch_root():
+    """Папка в памяти (/dev/shm), если она есть, иначе обычная временная папка."""
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        return "/dev/shm/synaq-scratch"
+    return os.path.join(tempfile.gettempdir(), "synaq-scratch")
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+class ScratchPool:
+    """
+    Рабочие папки посылок на хосте (исходник и готовый бинарник, которые монтируются в контейнер).
+    Папки лежат в root_dir (по умолчанию в памяти - /dev/shm) и не удаляются после
+    посылки, а очищаются и возвращаются в пул (не больше keep свободных).
+    Если папки в памяти заняли бы больше max_bytes, посылка получает обычную папку на диске.
+    Фоновый сборщик удаляет папки, брошенные упавшими процессами, и те, что не удалось удалить сразу.
+    """
+
+    def __init__(self, root_dir, max_bytes, keep=32):
+        self.root_dir = os.path.abspath(root_dir)
+        self.max_bytes = max_bytes
+        self.keep = keep
+        os.makedirs(self.root_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.idle = []
+        self.busy = {}  # путь -> сколько байт под нее зарезервировано
+        self.leftovers = set()  # Папки, которые не удалось удалить с первого раза
+        self.counter = 0
+
+    def start_reaper(self):
+        threading.Thread(target=self._reaper_loop, name="scratch-reaper", daemon=True).start()
+
+    def acquire(self, size_bytes=0):
+        """Пустая рабочая папка для посылки, в которую будет записано около size_bytes байт."""
+        with self.lock:
+            if sum(self.busy.values()) + size_bytes <= self.max_bytes:
+                if self.idle:
+                    path = self.idle.pop()
+                else:
+                    self.counter += 1
+                    path = os.path.join(self.root_dir, f"{DIR_PREFIX}{os.getpid()}-{self.counter}")
+                    os.makedirs(path, exist_ok=True)
+                self.busy[path] = size_bytes
+                return path
+        # Место в памяти закончилось - обычная папка на диске
+        return tempfile.mkdtemp(prefix=DIR_PREFIX)
+
+    def release(self, path):
+        with self.lock:
+            pooled = self.busy.pop(path, None) is not None
+        if pooled and self._clear(path):
+            with self.lock:
+                if len(self.idle) < self.keep:
+                    self.idle.append(path)
+                    return
+        self._remove(path)
+
+    def reap(self):
+        """Удаляет папки упавших процессов и то, что не удалось удалить раньше."""
+        with self.lock:
+            leftovers, self.leftovers = self.leftovers, set()
+        for path in leftovers:
+            self._remove(path)
+
+        removed = 0
+        for name in os.listdir(self.root_dir):
+            if not name.startswith(DIR_PREFIX):
+                continue
+            try:
+                pid = int(name[len(DIR_PREFIX):].split("-")[0])
+            except ValueError:
+                continue
+            if pid != os.getpid() and not _pid_alive(pid):
+                shutil.rmtree(os.path.join(self.root_dir, name), ignore_errors=True)
+                removed += 1
+        if removed:
+            print(f"INFO: Удалено брошенных рабочих папок: {removed}")
+
+    def _clear(self, path):
+        try:
+            for entry in os.listdir(path):
+                entry_path = os.path.join(path, entry)
+                if os.path.isdir(entry_path):
+                    shutil.rmtree(entry_path)
+                else:
+                    os.remove(entry_path)
+            return True
+        except OSError:
+            return False
+
+    def _remove(self, path):
+        try:
+            shutil.rmtree(path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            # Windows/Docker могут еще держать файлы - удалит сборщик
+            with self.lock:
+                self.leftovers.add(path)
+
+    def _reaper_loop(self):
+        while True:
+            try:
+                self.reap()
+            except Exception as e:
+                print(f"ERROR: Ошибка сборщика рабочих папок: {e}")
+            time.sleep(REAPER_INTERVAL)
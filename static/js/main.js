@@ -74,6 +74,10 @@ document.addEventListener('DOMContentLoaded', function() {
             `;
 
             data.details.forEach(test => {
+                // Процессорное время и пиковая память теста (если судья их сообщил)
+                const usage = test.cpu_time != null
+                    ? `<small class="text-muted ms-2">${test.cpu_time.toFixed(3)} с, ${(test.memory_kb / 1024).toFixed(1)} МБ</small>`
+                    : '';
                 
                 // --- (ВОТ УЛУЧШЕННАЯ ЛОГИКА ОТОБРАЖЕНИЯ) ---
                 let testResultClass = 'border-secondary';
@@ -107,7 +111,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 resultsHTML += `
                     <div class="card mb-3 ${testResultClass}">
                         <div class="card-header ${testHeaderClass}">
-                            <strong>Тест ${test.test_num}</strong> ${statusIcon}
+                            <strong>Тест ${test.test_num}</strong> ${statusIcon}${usage}
                         </div>
                         <div class="card-body">
                             <div class="row">
@@ -120,6 +124,7 @@ document.addEventListener('DOMContentLoaded', function() {
                                 <div class="col-md-6">
                                     <h6>Вывод программы:</h6>
                                     <pre class="bg-light p-2 rounded code-area">${test.output}</pre>
+                                    ${test.output_truncated ? '<small class="text-muted">Вывод слишком длинный, показано только начало.</small>' : ''}
                                     ${test.error.trim() ? `
                                     <h6>Ошибка выполнения:</h6>
                                     <pre class="bg-danger-subtle text-danger p-2 rounded code-area">${test.error}</pre>
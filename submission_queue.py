@@ -0,0 +1,84 @@
+import queue
+import threading
+import time
+import uuid
+import traceback
+from collections import OrderedDict
+
+
+class SubmissionQueue:
+    """
+    Очередь посылок на проверку.
+    HTTP-запрос только ставит посылку в очередь и сразу получает ее ID,
+    а проверяют посылки несколько рабочих потоков. Статус и результат
+    посылки можно узнать по ID, пока она не вытеснена более новыми (keep_jobs).
+    """
+
+    def __init__(self, workers, keep_jobs=5000):
+        self.keep_jobs = keep_jobs
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.jobs = OrderedDict()  # submission_id -> информация о посылке
+
+        for i in range(workers):
+            threading.Thread(target=self._worker_loop, name=f"judge-worker-{i}", daemon=True).start()
+
+    def submit(self, handler, args=(), **info):
+        """
+        Ставит посылку в очередь. handler(submission_id, *args) выполняется в рабочем
+        потоке и возвращает результат (dict). info - произвольные поля для статуса (владелец, задача...).
+        """
+        submission_id = uuid.uuid4().hex
+        job = dict(info)
+        job.update({
+            'submission_id': submission_id,
+            'status': 'queued',
+            'created_at': time.time(),
+            'result': None
+        })
+        with self.lock:
+            self.jobs[submission_id] = job
+            self._trim()
+        self.queue.put((submission_id, handler, args))
+        return submission_id
+
+    def get(self, submission_id):
+        """Копия информации о посылке или None, если такой нет."""
+        with self.lock:
+            job = self.jobs.get(submission_id)
+            return dict(job) if job else None
+
+    def depth(self):
+        """Сколько посылок ждут начала проверки."""
+        return self.queue.qsize()
+
+    def _worker_loop(self):
+        while True:
+            submission_id, handler, args = self.queue.get()
+            self._update(submission_id, status='running', started_at=time.time())
+            try:
+                result = handler(submission_id, *args)
+                self._update(submission_id, status='done', result=result, finished_at=time.time())
+            except Exception as e:
+                print(f"ERROR: Ошибка при проверке посылки {submission_id}: {e}")
+                traceback.print_exc()
+                self._update(submission_id, status='failed', result={'error': f"Ошибка сервера при проверке: {e}"},
+                             finished_at=time.time())
+            finally:
+                self.queue.task_done()
+
+    def _update(self, submission_id, **fields):
+        with self.lock:
+            job = self.jobs.get(submission_id)
+            if job:
+                job.update(fields)
+
+    def _trim(self):
+        # Удаляем самые старые завершенные посылки; ожидающие и идущие не трогаем
+        if len(self.jobs) <= self.keep_jobs:
+            return
+        for submission_id in list(self.jobs):
+            if len(self.jobs) <= self.keep_jobs:
+                break
+            if self.jobs[submission_id]['status'] in ('done', 'failed'):
+                del self.jobs[submission_id]
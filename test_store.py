@@ -0,0 +1,180 @@
+import os
+import json
+import hashlib
+import threading
+import time
+
+# Через сколько секунд неиспользуемые файлы тестов можно удалять
+# (судья, запущенный на старой версии, мог еще не дочитать их)
+GARBAGE_MIN_AGE = 3600
+
+
+class TestSet:
+    """Набор тестов, уже записанный в хранилище: имя набора и лимиты времени."""
+
+    def __init__(self, key, limits):
+        self.key = key
+        self.limits = limits
+
+    def __len__(self):
+        return len(self.limits)
+
+
+class TestStore:
+    """
+    Общее хранилище тестов на диске, которое монтируется в контейнеры судьи только для чтения.
+    Каждый вход и выход лежит в отдельном файле blobs/<sha256> (одинаковые данные
+    хранятся один раз), а набор тестов описывается файлом sets/<key>.json.
+    Набор записывается один раз на версию тестов задачи, а не на каждую посылку.
+    """
+
+    def __init__(self, root_dir):
+        self.root_dir = os.path.abspath(root_dir)
+        self.blobs_dir = os.path.join(self.root_dir, "blobs")
+        self.sets_dir = os.path.join(self.root_dir, "sets")
+        self.scripts_dir = os.path.join(self.root_dir, "judge")
+        for directory in (self.blobs_dir, self.sets_dir, self.scripts_dir):
+            os.makedirs(directory, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.known_sets = {}  # key -> TestSet
+        self.known_scripts = {}  # текст скрипта -> относительный путь
+
+    def get(self, key, loader, replaces=None):
+        """
+        Возвращает TestSet с именем key. Если набора еще нет на диске,
+        loader() должен вернуть список тестов [{'input', 'output', 'limit'}, ...].
+        replaces - префикс имен старых версий этого набора, которые при первом
+        обращении к новой версии больше не нужны.
+        """
+        with self.lock:
+            if key in self.known_sets:
+                return self.known_sets[key]
+
+        manifest_path = os.path.join(self.sets_dir, f"{key}.json")
+        test_set = self._read_manifest(key, manifest_path)
+        if test_set is None:
+            test_set = self._write_set(key, manifest_path, loader())
+
+        if replaces:
+            self.forget_versions(replaces, key)
+        with self.lock:
+            self.known_sets[key] = test_set
+        return test_set
+
+    def get_for_list(self, test_data_list):
+        """Набор для произвольного списка тестов: имя - хэш его содержимого."""
+        digest = hashlib.sha256(json.dumps(test_data_list, sort_keys=True).encode('utf-8')).hexdigest()
+        return self.get(f"adhoc-{digest}", lambda: test_data_list)
+
+    def load(self, key):
+        """Тесты набора key в том виде, в котором их принимает get() (для передачи на другой хост)."""
+        with open(os.path.join(self.sets_dir, f"{key}.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        tests = []
+        for test in manifest:
+            with open(os.path.join(self.blobs_dir, test["input"]), "r", encoding="utf-8") as f:
+                test_input = f.read()
+            with open(os.path.join(self.blobs_dir, test["output"]), "r", encoding="utf-8") as f:
+                test_output = f.read()
+            tests.append({'input': test_input, 'output': test_output,
+                          'limit': test["limit"], 'memory_limit': test.get("memory_limit")})
+        return tests
+
+    def put_script(self, text):
+        """Кладет скрипт судьи в хранилище (один раз) и возвращает путь относительно корня."""
+        with self.lock:
+            if text in self.known_scripts:
+                return self.known_scripts[text]
+
+        name = hashlib.sha256(text.encode('utf-8')).hexdigest()[:16] + ".py"
+        path = os.path.join(self.scripts_dir, name)
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+
+        relative_path = f"judge/{name}"
+        with self.lock:
+            self.known_scripts[text] = relative_path
+        return relative_path
+
+    def forget_versions(self, prefix, keep_key):
+        """Убирает описания старых версий набора (файлы тестов удалит collect_garbage)."""
+        with self.lock:
+            for key in list(self.known_sets):
+                if key.startswith(prefix) and key != keep_key:
+                    del self.known_sets[key]
+        for filename in os.listdir(self.sets_dir):
+            if filename.startswith(prefix) and filename != f"{keep_key}.json":
+                try:
+                    os.remove(os.path.join(self.sets_dir, filename))
+                except OSError:
+                    pass
+
+    def collect_garbage(self):
+        """Удаляет файлы тестов, на которые не ссылается ни один набор."""
+        referenced = set()
+        for filename in os.listdir(self.sets_dir):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.sets_dir, filename), "r", encoding="utf-8") as f:
+                    for test in json.load(f):
+                        referenced.add(test["input"])
+                        referenced.add(test["output"])
+            except (OSError, ValueError, KeyError):
+                continue
+
+        removed = 0
+        now = time.time()
+        for blob in os.listdir(self.blobs_dir):
+            path = os.path.join(self.blobs_dir, blob)
+            if blob in referenced or now - os.path.getmtime(path) < GARBAGE_MIN_AGE:
+                continue
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        if removed:
+            print(f"INFO: Хранилище тестов: удалено {removed} неиспользуемых файлов.")
+
+    def _read_manifest(self, key, manifest_path):
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return TestSet(key, [test["limit"] for test in manifest])
+
+    def _write_set(self, key, manifest_path, test_data_list):
+        manifest = []
+        for test in test_data_list:
+            manifest.append({
+                "input": self._write_blob(test.get('input', '')),
+                "output": self._write_blob(test.get('output', '')),
+                "limit": float(test.get('limit') or 1.0),
+                "memory_limit": test.get('memory_limit')
+            })
+
+        tmp_path = f"{manifest_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, manifest_path)
+        return TestSet(key, [test["limit"] for test in manifest])
+
+    def _write_blob(self, text):
+        data = text.encode('utf-8')
+        name = hashlib.sha256(data).hexdigest()
+        path = os.path.join(self.blobs_dir, name)
+        if os.path.exists(path):
+            # Файл снова нужен - продлеваем ему жизнь для collect_garbage
+            os.utime(path)
+        else:
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return name
@@ -0,0 +1,103 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Ошибка компиляции зависит только от кода, поэтому ее тоже можно кэшировать
+# (кроме превышения времени компиляции - оно может не повториться)
+COMPILATION_ERROR_PREFIX = "Compilation Error:"
+COMPILATION_TIMEOUT_MARK = "timed out"
+
+
+class VerdictCache:
+    """
+    Кэш вердиктов: один и тот же код на одном и том же наборе тестов
+    дает один и тот же результат, поэтому повторно Docker не запускаем.
+    Ключ - (хэш кода, язык, задача, версия набора тестов, режим "до первой ошибки").
+    Версия увеличивается при каждом изменении тестов задачи, так что старые записи
+    просто перестают совпадать.
+    В памяти хранится не больше max_entries записей (LRU); store (DBManager)
+    дополнительно сохраняет их в SQLite, чтобы кэш переживал перезапуск.
+    """
+
+    def __init__(self, max_entries, store=None):
+        self.max_entries = max_entries
+        self.store = store
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(code, language, task_id, tests_version, stop_on_fail=False):
+        code_hash = hashlib.sha256(code.encode('utf-8')).hexdigest()
+        mode = "first_fail" if stop_on_fail else "all"
+        return f"{language}:{task_id}:{tests_version}:{mode}:{code_hash}"
+
+    def get(self, code, language, task_id, tests_version, stop_on_fail=False):
+        """
+        Возвращает (verdicts, global_err) или None.
+        Для режима "до первой ошибки" подходит и полный прогон - он обрезается
+        на первом не-Accepted тесте.
+        """
+        cached = self._get(self.make_key(code, language, task_id, tests_version, stop_on_fail))
+        if cached is None and stop_on_fail:
+            cached = self._get(self.make_key(code, language, task_id, tests_version))
+            if cached is not None:
+                verdicts, global_err = cached
+                for i, v in enumerate(verdicts or []):
+                    if v.get('verdict') != "Accepted":
+                        verdicts = verdicts[:i + 1]
+                        break
+                cached = (verdicts, global_err)
+
+        with self.lock:
+            if cached is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return cached
+
+    def _get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+
+        cached = None
+        if self.store:
+            try:
+                cached = self.store.get_cached_verdict(key)
+            except Exception as e:
+                print(f"WARNING: Ошибка чтения кэша вердиктов из БД: {e}")
+
+        if cached is not None:
+            with self.lock:
+                self._remember(key, cached)
+        return cached
+
+    def put(self, code, language, task_id, tests_version, verdicts, global_err, stop_on_fail=False):
+        # Кэшируем только полноценные прогоны и ошибки компиляции: сбои Docker, общий таймаут
+        # и внутренние ошибки судьи могут не повториться при следующей попытке
+        if global_err:
+            if not global_err.startswith(COMPILATION_ERROR_PREFIX) or COMPILATION_TIMEOUT_MARK in global_err:
+                return
+        elif not verdicts:
+            return
+        if any(v.get('verdict') == "Internal Error" for v in verdicts or []):
+            return
+
+        key = self.make_key(code, language, task_id, tests_version, stop_on_fail)
+        with self.lock:
+            self._remember(key, (verdicts, global_err))
+
+        if self.store:
+            try:
+                self.store.save_cached_verdict(key, task_id, verdicts, global_err)
+            except Exception as e:
+                print(f"WARNING: Ошибка записи кэша вердиктов в БД: {e}")
+
+    def _remember(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)